@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Benchmark the n-gram phrase generation pipeline and write the results as JSON
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ngrams import Ngrams, NgramSampler, get_model_registry
+
+DIFFICULTIES = ("easy", "medium", "hard")
+ORDERS = (2, 3, 4, 5)
+SCALES = (1, 10, 100)
+
+
+def make_scaled_corpus(source: str, scale: int, directory: str, seed: int = 0) -> str:
+    """Write a copy of source with every section repeated `scale` times.
+
+    Each copy of a section's lines is shuffled, so the vocabulary stays the same
+    while the n-gram tables keep growing with the corpus.
+    """
+    with open(source, "rb") as f:
+        data = pickle.load(f)
+    reader = Ngrams(corpus_file=[source])
+    rng = random.Random(seed)
+    scaled = {}
+    for section in DIFFICULTIES:
+        lines = reader._extract_section_text(data, section).splitlines()
+        copies = [lines]
+        for _ in range(scale - 1):
+            copy = lines[:]
+            rng.shuffle(copy)
+            copies.append(copy)
+        scaled[section] = "\n".join("\n".join(copy) for copy in copies)
+
+    path = os.path.join(directory, f"corpora_x{scale}.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(scaled, f)
+    return path
+
+
+def measure(fn: Callable[[], object], repeat: int, memory: bool) -> Tuple[float, Optional[int], object]:
+    """Best wall time of `repeat` untraced runs, plus the tracemalloc peak of one more run."""
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def record(stage: str, scale: int, difficulty: str, n: Optional[int], seconds: float, peak: Optional[int],
+           tokens: int = 0, phrases: int = 0) -> Dict:
+    return {
+        "stage": stage,
+        "scale": scale,
+        "difficulty": difficulty,
+        "n": n,
+        "seconds": round(seconds, 6),
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / seconds, 1) if tokens and seconds > 0 else None,
+        "phrases": phrases,
+        "phrases_per_second": round(phrases / seconds, 1) if phrases and seconds > 0 else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_section(corpus: str, scale: int, difficulty: str, orders: Tuple[int, ...], num_phrases: int,
+                  samples: int, repeat: int, memory: bool) -> List[Dict]:
+    results = []
+    ngrams = Ngrams(corpus_file=[corpus], difficulty=difficulty)
+
+    # Tokenizing and word-difficulty analysis do not depend on n
+    seconds, peak, tokens = measure(lambda: ngrams._read_tokens(ngrams.corpus_file, difficulty), repeat, memory)
+    results.append(record("tokenize", scale, difficulty, None, seconds, peak, tokens=len(tokens)))
+
+    words = [tok for tok in tokens if tok.isalpha()]
+    seconds, peak, _ = measure(
+        lambda: Ngrams(corpus_file=[corpus], difficulty=difficulty)._analyze_word_difficulty(words), repeat, memory
+    )
+    results.append(record("analyze_word_difficulty", scale, difficulty, None, seconds, peak, tokens=len(words)))
+
+    for n in orders:
+        ngrams = Ngrams(corpus_file=[corpus], n=n, num_phrases=num_phrases, difficulty=difficulty)
+
+        seconds, peak, built = measure(lambda: ngrams._build_ngram_model(tokens, n=n), repeat, memory)
+        results.append(record("build_ngram_model", scale, difficulty, n, seconds, peak, tokens=len(tokens)))
+        id_to_token, models_by_order, unigram_counts = built
+
+        # same length-filtered candidate pool that generate_phrases samples from
+        sampler = NgramSampler(id_to_token, models_by_order, unigram_counts, n,
+                               ngrams._get_interpolation_weights(n), ngrams._in_length_range)
+        contexts = [tuple(words[i:i + n - 1]) for i in range(0, max(1, len(words) - n), max(1, len(words) // 256))]
+
+        def sample_tokens() -> int:
+            random.seed(0)
+            sampler._context_cache.clear()
+            for i in range(samples):
+                sampler.sample(contexts[i % len(contexts)])
+            return samples
+
+        seconds, peak, _ = measure(sample_tokens, repeat, memory)
+        results.append(record("sample_next_token", scale, difficulty, n, seconds, peak, tokens=samples))
+
+        def sample_phrases() -> List[str]:
+            return ngrams._sample_phrases(id_to_token, models_by_order, unigram_counts, num_phrases,
+                                          lambda: ngrams._generate_fallback_phrases(unigram_counts, 1)[0])
+
+        seconds, peak, phrases = measure(sample_phrases, repeat, memory)
+        results.append(record("sample_phrases", scale, difficulty, n, seconds, peak,
+                              tokens=sum(len(p.split()) for p in phrases), phrases=len(phrases)))
+
+        # End to end: a cold call compiles the model, a warm one reuses the registry
+        def generate_cold() -> List[str]:
+            get_model_registry().clear()
+            return ngrams.generate_phrases()
+
+        seconds, peak, phrases = measure(generate_cold, repeat, memory)
+        results.append(record("generate_phrases_cold", scale, difficulty, n, seconds, peak,
+                              tokens=sum(len(p.split()) for p in phrases), phrases=len(phrases)))
+
+        ngrams.get_shared_model()
+        seconds, peak, phrases = measure(ngrams.generate_phrases, repeat, memory)
+        results.append(record("generate_phrases_warm", scale, difficulty, n, seconds, peak,
+                              tokens=sum(len(p.split()) for p in phrases), phrases=len(phrases)))
+        get_model_registry().clear()
+    return results
+
+
+def run_benchmarks(corpus: str, scales: Tuple[int, ...] = SCALES, difficulties: Tuple[str, ...] = DIFFICULTIES,
+                   orders: Tuple[int, ...] = ORDERS, num_phrases: int = 50, samples: int = 20000,
+                   repeat: int = 1, memory: bool = True) -> Dict:
+    work_dir = tempfile.mkdtemp(prefix="ngrams-bench-")
+    results = []
+    try:
+        for scale in scales:
+            scaled_corpus = make_scaled_corpus(corpus, scale, work_dir)
+            for difficulty in difficulties:
+                print(f"⏱️  {difficulty} x{scale}...", file=sys.stderr)
+                results.extend(bench_section(scaled_corpus, scale, difficulty, orders, num_phrases, samples, repeat, memory))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        get_model_registry().clear()
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": os.path.abspath(corpus),
+        "settings": {
+            "scales": list(scales),
+            "difficulties": list(difficulties),
+            "orders": list(orders),
+            "num_phrases": num_phrases,
+            "samples": samples,
+            "repeat": repeat,
+            "memory": memory,
+        },
+        "results": results,
+    }
+
+
+def print_summary(report: Dict) -> None:
+    print(f"{'stage':<24}{'scale':>6}{'diff':>8}{'n':>4}{'seconds':>11}{'tokens/s':>14}{'phrases/s':>11}{'peak MB':>9}")
+    for row in report["results"]:
+        tokens = f"{row['tokens_per_second']:.0f}" if row["tokens_per_second"] else "-"
+        phrases = f"{row['phrases_per_second']:.0f}" if row["phrases_per_second"] else "-"
+        peak = f"{row['peak_memory_bytes'] / 1e6:.1f}" if row["peak_memory_bytes"] is not None else "-"
+        n = row["n"] if row["n"] is not None else "-"
+        print(f"{row['stage']:<24}{row['scale']:>6}{row['difficulty']:>8}{n:>4}{row['seconds']:>11.4f}{tokens:>14}{phrases:>11}{peak:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the n-gram generation pipeline.")
+    parser.add_argument("--corpus", default="corpora/corpora.pkl", help="corpus pickle to scale")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--difficulties", nargs="+", choices=DIFFICULTIES, default=list(DIFFICULTIES))
+    parser.add_argument("--orders", type=int, nargs="+", default=list(ORDERS), help="n-gram orders to build")
+    parser.add_argument("--phrases", type=int, default=50, help="phrases per generation run")
+    parser.add_argument("--samples", type=int, default=20000, help="next-token draws per sampler run")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage; the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.corpus, tuple(args.scales), tuple(args.difficulties), tuple(args.orders),
+        args.phrases, args.samples, args.repeat, not args.no_memory,
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
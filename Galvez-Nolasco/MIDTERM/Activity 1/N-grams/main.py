@@ -117,6 +117,7 @@ def show_difficulty_stats():
     print("\n DIFFICULTY STATISTICS (per mode)")
     print("Analyzing each corpora section for word complexity...")
     try:
+        Ngrams(corpus_file=["corpora/corpora.pkl"]).warm_shared_models(("easy", "medium", "hard"))
         for diff in ("easy", "medium", "hard"):
             ngrams_obj = Ngrams(corpus_file=["corpora/corpora.pkl"], difficulty=diff)
             stats = ngrams_obj.get_difficulty_stats()
@@ -186,6 +187,7 @@ def verify_corpora_and_generation():
         show_overlap("Hard ∩ Medium", hard_med_overlap)
 
         print("\n Generation validation (words must belong to the selected section):")
+        Ngrams(corpus_file=["corpora/corpora.pkl"], n=3).warm_shared_models(("easy", "medium", "hard"))
         for diff, allowed_set in [("easy", easy_set), ("medium", med_set), ("hard", hard_set)]:
             try:
                 ngrams_obj = Ngrams(corpus_file=["corpora/corpora.pkl"], n=3, num_phrases=6, difficulty=diff)
@@ -326,7 +328,8 @@ def manage_corpus():
     print("2. View corpus information (rb)")
     print("3. Update corpus section (rb + wb)")
     print("4. Add text to corpus section (rb + wb)")
-    print("5. Back to main menu")
+    print("5. Compile n-gram model artifacts (rb + wb)")
+    print("6. Back to main menu")
     
     choice = prompt("\nYour choice > ")
     
@@ -339,6 +342,8 @@ def manage_corpus():
     elif choice == "4":
         add_text_to_corpus()
     elif choice == "5":
+        compile_model_artifacts()
+    elif choice == "6":
         return
     else:
         print("Invalid choice")
@@ -354,6 +359,16 @@ def create_corpus_from_files():
         print("❌ Failed to create corpus")
 
 
+def compile_model_artifacts():
+    print("\n🧠 Compiling n-gram model artifacts (using rb + wb)...")
+    ngrams_obj = Ngrams(corpus_file=["corpora/corpora.pkl"])
+    success = ngrams_obj.compile_model_artifacts()
+    if success:
+        print("✅ Models compiled! Phrase generation will load them instead of rebuilding.")
+    else:
+        print("❌ Failed to compile models")
+
+
 def view_corpus_info():
     print("\n📊 Corpus Information (using rb):")
     ngrams_obj = Ngrams()
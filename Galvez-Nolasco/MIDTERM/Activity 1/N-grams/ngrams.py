@@ -1,9 +1,704 @@
 import random
 import math
 import re
+import os
+import json
+import codecs
+import mmap
+import struct
+import sys
+from array import array
+import bisect
 import pickle
-from collections import Counter
-from typing import List, Tuple, Union, Optional, Dict
+import tempfile
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from typing import List, Tuple, Union, Optional, Dict, Iterable, Iterator
+
+
+MODEL_FORMAT_VERSION = 3
+MODEL_MAX_ORDER = 5
+MODEL_SHUFFLED_VARIANTS = 3
+MODEL_DIR_NAME = "models"
+
+REGISTRY_MAX_MODELS = 12
+REGISTRY_MAX_BYTES = 256 * 1024 * 1024
+
+CORPUS_CONTAINER_EXT = ".ngc"
+CORPUS_CONTAINER_MAGIC = b"NGCORPUS"
+CORPUS_CONTAINER_VERSION = 1
+CORPUS_ALL_SECTIONS = "*"
+
+TOKENIZE_CHUNK_SIZE = 1 << 20
+BUILD_SHARD_CHARS = 4 * TOKENIZE_CHUNK_SIZE
+SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+')
+WORD_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Midpoints of four equal bands of the 1.2-1.5 sampling temperature range
+TEMPERATURE_LEVELS = (1.2375, 1.3125, 1.3875, 1.4625)
+SAMPLING_JITTER = 0.01
+
+START_ID = 0
+END_ID = 1
+
+
+class NgramTable:
+    """Counts for one n-gram order in CSR form.
+
+    Each context (the previous order - 1 token ids) is packed into one integer,
+    `bits` bits per token, and the packed contexts are kept sorted. Row i holds
+    successors[offsets[i]:offsets[i + 1]] with matching counts and totals[i].
+
+    Rows changed by merge_counts are kept in a small overlay,
+    {packed context: (successors, counts, total)}, that shadows the arrays
+    until it grows past OVERLAY_FRACTION of the rows and is folded in.
+    Read rows through row() so the overlay is seen.
+    """
+
+    OVERLAY_FRACTION = 8
+    OVERLAY_MIN_ROWS = 256
+
+    def __init__(self, order: int, bits: int, contexts, offsets: array, successors: array, counts: array, totals: array,
+                 overlay: Optional[Dict[int, Tuple[array, array, int]]] = None):
+        self.order = order
+        self.bits = bits
+        self.contexts = contexts
+        self.offsets = offsets
+        self.successors = successors
+        self.counts = counts
+        self.totals = totals
+        self.overlay = overlay or {}
+
+    def __len__(self) -> int:
+        return len(self.folded().contexts)
+
+    @staticmethod
+    def _context_array(order: int, bits: int, values=()):
+        # packed contexts wider than 64 bits fall back to a list of Python ints
+        return array("Q", values) if bits * (order - 1) <= 64 else list(values)
+
+    @classmethod
+    def from_counts(cls, order: int, bits: int, ngram_counts: Dict[int, int]) -> "NgramTable":
+        """Build from {packed context << bits | successor id: count}."""
+        mask = (1 << bits) - 1
+        contexts = cls._context_array(order, bits)
+        offsets = array("I", [0])
+        successors = array("I")
+        counts = array("I")
+        totals = array("I")
+        previous = None
+        for key in sorted(ngram_counts):
+            ctx = key >> bits
+            if ctx != previous:
+                if previous is not None:
+                    offsets.append(len(successors))
+                contexts.append(ctx)
+                totals.append(0)
+                previous = ctx
+            count = ngram_counts[key]
+            successors.append(key & mask)
+            counts.append(count)
+            totals[-1] += count
+        if previous is not None:
+            offsets.append(len(successors))
+        return cls(order, bits, contexts, offsets, successors, counts, totals)
+
+    def to_counts(self, bits: Optional[int] = None) -> Dict[int, int]:
+        """Inverse of from_counts, optionally repacking keys to a wider `bits`."""
+        if self.overlay:
+            return self.folded().to_counts(bits)
+        bits = self.bits if bits is None else bits
+        old_mask = (1 << self.bits) - 1
+        ngram_counts: Dict[int, int] = {}
+        for row, ctx in enumerate(self.contexts):
+            if bits != self.bits:
+                ids = []
+                for _ in range(self.order - 1):
+                    ids.append(ctx & old_mask)
+                    ctx >>= self.bits
+                ctx = _pack_ids(reversed(ids), bits)
+            base = ctx << bits
+            for j in range(self.offsets[row], self.offsets[row + 1]):
+                ngram_counts[base | self.successors[j]] = self.counts[j]
+        return ngram_counts
+
+    def row(self, key: int) -> Optional[Tuple[array, array, int]]:
+        """(successors, counts, total) of the row for packed context key, or None."""
+        entry = self.overlay.get(key)
+        if entry is not None:
+            return entry if entry[2] else None
+        row = self.find(key)
+        if row < 0:
+            return None
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.successors[start:end], self.counts[start:end], self.totals[row]
+
+    def merge_counts(self, deltas: Dict[int, int]) -> "NgramTable":
+        """Return a copy with deltas ({packed key: count change}, same bits) added.
+
+        The changed rows go into the copy's overlay and the arrays are shared
+        with this table, so the cost follows the size of deltas. N-grams whose
+        count drops to zero are removed.
+        """
+        bits = self.bits
+        mask = (1 << bits) - 1
+        by_context: Dict[int, Dict[int, int]] = {}
+        for key, delta in deltas.items():
+            if delta:
+                row_deltas = by_context.setdefault(key >> bits, {})
+                row_deltas[key & mask] = row_deltas.get(key & mask, 0) + delta
+
+        overlay = dict(self.overlay)
+        for ctx, row_deltas in by_context.items():
+            current = self.row(ctx)
+            merged = dict(zip(current[0], current[1])) if current is not None else {}
+            for successor, delta in row_deltas.items():
+                merged[successor] = merged.get(successor, 0) + delta
+            row_counts = sorted((successor, count) for successor, count in merged.items() if count > 0)
+            overlay[ctx] = (
+                array("I", [successor for successor, _ in row_counts]),
+                array("I", [count for _, count in row_counts]),
+                sum(count for _, count in row_counts),
+            )
+
+        table = NgramTable(self.order, bits, self.contexts, self.offsets, self.successors, self.counts, self.totals, overlay)
+        if len(overlay) > max(self.OVERLAY_MIN_ROWS, len(self.contexts) // self.OVERLAY_FRACTION):
+            return table.folded()
+        return table
+
+    def folded(self) -> "NgramTable":
+        """This table with its overlay written into the arrays."""
+        if not self.overlay:
+            return self
+        contexts = self._context_array(self.order, self.bits)
+        offsets = array("I", [0])
+        successors = array("I")
+        counts = array("I")
+        totals = array("I")
+
+        def copy_rows(first: int, last: int) -> None:
+            # untouched rows are copied as slices, shifting their offsets
+            if first >= last:
+                return
+            start, stop = self.offsets[first], self.offsets[last]
+            shift = len(successors) - start
+            contexts.extend(self.contexts[first:last])
+            row_ends = self.offsets[first + 1:last + 1]
+            offsets.extend(map(shift.__add__, row_ends) if shift else row_ends)
+            successors.extend(self.successors[start:stop])
+            counts.extend(self.counts[start:stop])
+            totals.extend(self.totals[first:last])
+
+        done = 0
+        for ctx in sorted(self.overlay):
+            row = bisect.bisect_left(self.contexts, ctx, done)
+            copy_rows(done, row)
+            done = row + 1 if row < len(self.contexts) and self.contexts[row] == ctx else row
+            row_successors, row_counts, total = self.overlay[ctx]
+            if total:
+                contexts.append(ctx)
+                successors.extend(row_successors)
+                counts.extend(row_counts)
+                totals.append(total)
+                offsets.append(len(successors))
+        copy_rows(done, len(self.contexts))
+        return NgramTable(self.order, self.bits, contexts, offsets, successors, counts, totals)
+
+    def pack(self, ids: Iterable[int]) -> int:
+        return _pack_ids(ids, self.bits)
+
+    def find(self, key: int) -> int:
+        row = bisect.bisect_left(self.contexts, key)
+        if row < len(self.contexts) and self.contexts[row] == key:
+            return row
+        return -1
+
+    def nbytes(self) -> int:
+        columns = (self.offsets, self.successors, self.counts, self.totals)
+        size = sum(col.itemsize * len(col) for col in columns)
+        size += sum(120 + 4 * (len(row[0]) + len(row[1])) for row in self.overlay.values())
+        if isinstance(self.contexts, array):
+            return size + self.contexts.itemsize * len(self.contexts)
+        return size + 36 * len(self.contexts)
+
+    def to_dict(self) -> dict:
+        if self.overlay:
+            return self.folded().to_dict()
+
+        def column(values):
+            return values.tobytes() if isinstance(values, array) else list(values)
+        return {
+            "order": self.order,
+            "bits": self.bits,
+            "contexts": column(self.contexts),
+            "offsets": column(self.offsets),
+            "successors": column(self.successors),
+            "counts": column(self.counts),
+            "totals": column(self.totals),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NgramTable":
+        def column(typecode: str, raw: bytes) -> array:
+            values = array(typecode)
+            values.frombytes(raw)
+            return values
+        order, bits = int(data["order"]), int(data["bits"])
+        contexts = data["contexts"]
+        if isinstance(contexts, bytes):
+            contexts = column("Q", contexts)
+        return cls(
+            order, bits, contexts,
+            column("I", data["offsets"]),
+            column("I", data["successors"]),
+            column("I", data["counts"]),
+            column("I", data["totals"]),
+        )
+
+
+NgramTables = Dict[int, NgramTable]
+
+
+def _pack_ids(ids: Iterable[int], bits: int) -> int:
+    key = 0
+    for token_id in ids:
+        key = (key << bits) | token_id
+    return key
+
+
+@dataclass(frozen=True)
+class CompiledModel:
+    section: str
+    max_order: int
+    sources: List[Dict[str, Union[str, int]]]
+    token_counts: Counter
+    unigram_counts: Counter
+    id_to_token: List[str]
+    models_by_order: NgramTables
+    shuffled_models: List[NgramTables] = field(default_factory=list)
+    word_difficulty: Dict[str, str] = field(default_factory=dict)
+    # last max_order - 1 words of the final sentence, and whether it ended in . ! or ?
+    tail: List[str] = field(default_factory=list)
+    ends_sentence: bool = True
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.token_counts.values())
+
+    @property
+    def vocabulary(self) -> List[str]:
+        return sorted(tok for tok in self.token_counts if tok not in ("<START>", "<END>"))
+
+    def estimated_bytes(self) -> int:
+        # array columns are counted exactly; ~120 bytes per dict entry for the word maps
+        tables = sum(table.nbytes() for model in [self.models_by_order, *self.shuffled_models] for table in model.values())
+        words = len(self.token_counts) + len(self.unigram_counts) + len(self.word_difficulty) + len(self.id_to_token)
+        return tables + words * 120
+
+    def to_dict(self) -> dict:
+        return {
+            "format": "ngrams-model",
+            "version": MODEL_FORMAT_VERSION,
+            "section": self.section,
+            "max_order": self.max_order,
+            "sources": self.sources,
+            "vocabulary": self.vocabulary,
+            "token_counts": dict(self.token_counts),
+            "unigram_counts": dict(self.unigram_counts),
+            "byteorder": sys.byteorder,
+            "id_to_token": self.id_to_token,
+            "models_by_order": _tables_to_dict(self.models_by_order),
+            "shuffled_models": [_tables_to_dict(m) for m in self.shuffled_models],
+            "word_difficulty": self.word_difficulty,
+            "tail": self.tail,
+            "ends_sentence": self.ends_sentence,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompiledModel":
+        if data.get("format") != "ngrams-model" or data.get("version") != MODEL_FORMAT_VERSION:
+            raise ValueError("Unsupported model artifact version.")
+        if data.get("byteorder") != sys.byteorder:
+            raise ValueError("Model artifact was written on a machine with a different byte order.")
+        return cls(
+            section=data["section"],
+            max_order=int(data["max_order"]),
+            sources=list(data["sources"]),
+            token_counts=Counter(data["token_counts"]),
+            unigram_counts=Counter(data["unigram_counts"]),
+            id_to_token=list(data["id_to_token"]),
+            models_by_order=_tables_from_dict(data["models_by_order"]),
+            shuffled_models=[_tables_from_dict(m) for m in data.get("shuffled_models", [])],
+            word_difficulty=dict(data.get("word_difficulty", {})),
+            tail=list(data.get("tail", [])),
+            ends_sentence=bool(data.get("ends_sentence", True)),
+        )
+
+
+def _tables_to_dict(tables: NgramTables) -> Dict[int, dict]:
+    return {order: table.to_dict() for order, table in tables.items()}
+
+
+def _tables_from_dict(data: Dict[int, dict]) -> NgramTables:
+    return {int(order): NgramTable.from_dict(table) for order, table in data.items()}
+
+
+def _file_signature(path: str, with_hash: bool = True) -> Dict[str, Union[str, int]]:
+    stat = os.stat(path)
+    signature: Dict[str, Union[str, int]] = {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        signature["sha256"] = digest.hexdigest()
+    return signature
+
+
+def _signature_is_fresh(recorded: Dict[str, Union[str, int]], path: str) -> bool:
+    try:
+        current = _file_signature(path, with_hash=False)
+    except OSError:
+        return False
+    if current["size"] != recorded.get("size"):
+        return False
+    if current["mtime_ns"] == recorded.get("mtime_ns"):
+        return True
+    # mtime changes on checkout/copy; fall back to comparing contents
+    return _file_signature(path)["sha256"] == recorded.get("sha256")
+
+
+def _trailing_space_start(text: str) -> int:
+    end = len(text)
+    while end and text[end - 1].isspace():
+        end -= 1
+    return end
+
+
+def _last_word_break(text: str) -> int:
+    # Start of the last whitespace run that cannot be a sentence break, or 0.
+    # Cutting there never splits a token or hides the punctuation a break needs.
+    i = len(text) - 1
+    while i > 0:
+        if text[i].isspace() and not text[i - 1].isspace() and text[i - 1] not in ".!?":
+            return i
+        i -= 1
+    return 0
+
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _write_atomically(path: str, write) -> None:
+    # Each writer gets its own temp file beside the target, so concurrent saves never share one
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        # mkstemp creates the file owner-only; give it the mode a plain open() would
+        os.chmod(temp_file, 0o644)
+        os.replace(temp_file, path)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+
+
+class CorpusContainer:
+    """Read-only view of a corpus container: a section directory followed by UTF-8 payloads.
+
+    Layout: magic, then little-endian u32 version and u32 header length, then a JSON
+    header {"source": signature, "sections": {name: [offset, length]}} and the payloads.
+    The file is memory-mapped so only the requested section is ever decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            prefix = len(CORPUS_CONTAINER_MAGIC)
+            if self._mm[:prefix] != CORPUS_CONTAINER_MAGIC:
+                raise ValueError(f"{path} is not a corpus container.")
+            version, header_len = struct.unpack_from("<II", self._mm, prefix)
+            if version != CORPUS_CONTAINER_VERSION:
+                raise ValueError(f"Unsupported corpus container version {version}.")
+            start = prefix + 8
+            header = json.loads(self._mm[start:start + header_len].decode("utf-8"))
+        except Exception:
+            self._mm.close()
+            raise
+        self._payload_start = start + header_len
+        self.source: Optional[Dict[str, Union[str, int]]] = header.get("source")
+        self.sections: Dict[str, List[int]] = header["sections"]
+
+    def __enter__(self) -> "CorpusContainer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def section_text(self, section: Optional[str]) -> str:
+        name = section.lower() if section else CORPUS_ALL_SECTIONS
+        if name not in self.sections:
+            name = CORPUS_ALL_SECTIONS
+        offset, length = self.sections[name]
+        start = self._payload_start + offset
+        view = memoryview(self._mm)[start:start + length]
+        try:
+            return str(view, "utf-8")
+        finally:
+            view.release()
+
+    def iter_section(self, section: Optional[str], chunk_size: int = TOKENIZE_CHUNK_SIZE) -> Iterator[str]:
+        name = section.lower() if section else CORPUS_ALL_SECTIONS
+        if name not in self.sections:
+            name = CORPUS_ALL_SECTIONS
+        offset, length = self.sections[name]
+        start = self._payload_start + offset
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for pos in range(start, start + length, chunk_size):
+            view = memoryview(self._mm)[pos:min(pos + chunk_size, start + length)]
+            try:
+                text = decoder.decode(view)
+            finally:
+                view.release()
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    @staticmethod
+    def write(path: str, sections: Dict[str, str], source: Optional[Dict[str, Union[str, int]]] = None) -> None:
+        payloads = []
+        directory: Dict[str, List[int]] = {}
+        offset = 0
+        for name, text in sections.items():
+            encoded = text.encode("utf-8")
+            directory[name] = [offset, len(encoded)]
+            payloads.append(encoded)
+            offset += len(encoded)
+        header = json.dumps({"source": source, "sections": directory}).encode("utf-8")
+
+        def write_container(f):
+            f.write(CORPUS_CONTAINER_MAGIC)
+            f.write(struct.pack("<II", CORPUS_CONTAINER_VERSION, len(header)))
+            f.write(header)
+            for payload in payloads:
+                f.write(payload)
+
+        _write_atomically(path, write_container)
+
+
+class ModelRegistry:
+    def __init__(self, max_models: int = REGISTRY_MAX_MODELS, max_bytes: int = REGISTRY_MAX_BYTES):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._models: "OrderedDict[tuple, Tuple[CompiledModel, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: tuple, build_fn) -> CompiledModel:
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        model = build_fn()
+        size = model.estimated_bytes()
+
+        with self._lock:
+            if key in self._models:
+                return self._models[key][0]
+            # an older signature of the same corpus/section/order is now stale
+            for stale_key in [k for k in self._models if k[0] == key[0] and k[2:] == key[2:]]:
+                self._discard(stale_key)
+            self._models[key] = (model, size)
+            self._total_bytes += size
+            while len(self._models) > 1 and (len(self._models) > self.max_models or self._total_bytes > self.max_bytes):
+                self._discard(next(iter(self._models)))
+        return model
+
+    def peek(self, key: tuple) -> Optional[CompiledModel]:
+        with self._lock:
+            entry = self._models.get(key)
+        return entry[0] if entry is not None else None
+
+    def _discard(self, key: tuple) -> None:
+        _, size = self._models.pop(key)
+        self._total_bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "estimated_bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_model_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return _model_registry
+
+
+def _expected_tempered(p: float, exponent: float) -> float:
+    # E[(p + U(0, jitter)) ** exponent]: the mean of the jittered, tempered score
+    k1 = exponent + 1.0
+    return ((p + SAMPLING_JITTER) ** k1 - p ** k1) / (SAMPLING_JITTER * k1)
+
+
+class NgramSampler:
+    """Draws the next token from interpolated n-gram scores using prefix sums.
+
+    This approximates the per-call scoring it replaced rather than
+    reproducing it exactly: the temperature, drawn uniformly from 1.2-1.5
+    per call, is snapped to one of the TEMPERATURE_LEVELS midpoints, and
+    each candidate's random jitter is replaced by its expected effect on the
+    tempered score (see _expected_tempered). Both keep the unigram weights
+    fixed, so they can be summed once per level instead of per draw.
+    On the bundled corpus the next-token distribution stays within about
+    6e-5 total variation of the old one; test_ngrams.py checks the bound.
+    """
+
+    def __init__(self, id_to_token: List[str], models_by_order: NgramTables, unigram_counts: Counter, n: int,
+                 lambdas: Dict[int, float], in_length_range_fn):
+        self.models_by_order = models_by_order
+        self.token_ids: Dict[str, int] = {tok: i for i, tok in enumerate(id_to_token)}
+        self.n = max(2, int(n))
+        self.lambdas = lambdas
+
+        candidates = list(unigram_counts.keys())
+        good_tokens = [t for t in candidates if t == "<END>" or (t.isalpha() and in_length_range_fn(len(t)))]
+        self.pool: List[str] = good_tokens if good_tokens else candidates
+        # pool position for each token id, -1 when the token is not in the pool
+        self.pool_slot = array("i", [-1]) * len(id_to_token)
+        for i, tok in enumerate(self.pool):
+            token_id = self.token_ids.get(tok)
+            if token_id is not None:
+                self.pool_slot[token_id] = i
+        self.start_words: List[str] = [tok for tok in candidates if tok.isalpha() and tok not in ["<START>", "<END>"]]
+
+        total_unigrams = sum(unigram_counts.values()) or 1
+        self._base = [lambdas[1] * (unigram_counts.get(tok, 0) / total_unigrams) for tok in self.pool]
+        self._exponents = [1.0 / t for t in TEMPERATURE_LEVELS]
+        self._weights: List[List[float]] = []
+        self._prefix: List[List[float]] = []
+        for exponent in self._exponents:
+            weights = [_expected_tempered(p, exponent) for p in self._base]
+            self._weights.append(weights)
+            self._prefix.append(list(itertools.accumulate(weights)))
+
+        self._context_cache: Dict[Tuple[str, ...], List[Tuple[int, float]]] = {}
+
+    def _context_mass(self, ctx: Tuple[str, ...]) -> List[Tuple[int, float]]:
+        cached = self._context_cache.get(ctx)
+        if cached is not None:
+            return cached
+
+        extra: Dict[int, float] = {}
+        ctx_ids = [self.token_ids.get(tok, -1) for tok in ctx]
+        for order in range(2, self.n + 1):
+            weight = self.lambdas.get(order, 0.0)
+            table = self.models_by_order.get(order)
+            if weight <= 0 or table is None:
+                continue
+            order_ids = ctx_ids[-(order - 1):]
+            if -1 in order_ids:
+                continue
+            row = table.row(table.pack(order_ids))
+            if row is None:
+                continue
+            successors, counts, total = row
+            denom = total or 1
+            for token_id, count in zip(successors, counts):
+                idx = self.pool_slot[token_id]
+                if idx >= 0:
+                    extra[idx] = extra.get(idx, 0.0) + weight * (count / denom)
+
+        entry = sorted(extra.items())
+        self._context_cache[ctx] = entry
+        return entry
+
+    def sample(self, ctx: Tuple[str, ...]) -> Optional[str]:
+        if not self.pool:
+            return None
+
+        if random.random() < 0.1:
+            return random.choice(self.pool)
+
+        level = random.randrange(len(self._exponents))
+        exponent = self._exponents[level]
+        weights = self._weights[level]
+        prefix = self._prefix[level]
+
+        boosted = [(idx, _expected_tempered(self._base[idx] + extra, exponent))
+                   for idx, extra in self._context_mass(ctx)]
+        boosted_total = sum(w for _, w in boosted)
+        if len(boosted) == len(self.pool):
+            background_total = 0.0
+        else:
+            background_total = prefix[-1] - sum(weights[idx] for idx, _ in boosted)
+
+        r = random.random() * (boosted_total + background_total)
+        if boosted and (r < boosted_total or background_total <= 0):
+            for idx, w in boosted:
+                r -= w
+                if r <= 0:
+                    return self.pool[idx]
+            return self.pool[boosted[-1][0]]
+
+        # Background draw over the unigram-only mass. The tokens already scored
+        # through the context are cut out of the prefix sums: r is a position
+        # in the remaining mass, shifted past each excluded interval before it.
+        r -= boosted_total
+        for idx, _ in boosted:
+            if r < prefix[idx] - weights[idx]:
+                break
+            r += weights[idx]
+        last = len(self.pool) - 1
+        idx = min(last, bisect.bisect_right(prefix, r))
+        excluded = {i for i, _ in boosted}
+        if idx in excluded:
+            # rounding landed on an excluded token; take the nearest one left
+            below = (i for i in range(idx - 1, -1, -1) if i not in excluded)
+            above = (i for i in range(idx + 1, last + 1) if i not in excluded)
+            idx = next(above, None)
+            if idx is None:
+                idx = next(below)
+        return self.pool[idx]
 
 
 class Ngrams:
@@ -16,7 +711,6 @@ class Ngrams:
         self.difficulty = difficulty.lower()
         
         self._text_cache: Optional[str] = None
-        self._tokens_cache: Optional[List[str]] = None
         self._word_difficulty_cache: Dict[str, str] = {}
         self._tokens_analyzed: List[str] = []
         self._difficulty_words_cache: Optional[List[str]] = None
@@ -25,15 +719,58 @@ class Ngrams:
 
     def save_corpus(self, data: dict, filename: str = "corpora/corpora.pkl") -> bool:
         try:
-            with open(filename, "wb") as f:
-                pickle.dump(data, f)
+            if filename.lower().endswith(CORPUS_CONTAINER_EXT):
+                CorpusContainer.write(filename, self._container_sections(data))
+            else:
+                with open(filename, "wb") as f:
+                    pickle.dump(data, f)
+                self._write_corpus_container(data, filename)
             print(f"✅ Corpus saved successfully to {filename}")
             return True
         except Exception as e:
             print(f"❌ Error saving corpus: {e}")
             return False
 
-    def create_corpus_from_text_files(self, output_file: str = "corpora/corpora.pkl") -> bool:
+    def corpus_container_path(self, corpus_file: str) -> str:
+        return f"{os.path.splitext(corpus_file)[0]}{CORPUS_CONTAINER_EXT}"
+
+    def _container_sections(self, data: Union[str, List, tuple, dict]) -> Dict[str, str]:
+        # Store every section already resolved the way _extract_section_text would
+        names = ["easy", "medium", "hard"]
+        if isinstance(data, dict):
+            names.extend(str(k).lower() for k in data.keys())
+        sections = {CORPUS_ALL_SECTIONS: self._extract_section_text(data, None)}
+        for name in dict.fromkeys(names):
+            sections[name] = self._extract_section_text(data, name)
+        return sections
+
+    def _write_corpus_container(self, data: Union[str, List, tuple, dict], corpus_file: str) -> None:
+        try:
+            CorpusContainer.write(
+                self.corpus_container_path(corpus_file),
+                self._container_sections(data),
+                source=_file_signature(corpus_file),
+            )
+        except (OSError, ValueError):
+            # the container is only a cache of the pickle
+            pass
+
+    def _load_pickle_section(self, corpus_file: str, difficulty_section: Optional[str]) -> str:
+        container_file = self.corpus_container_path(corpus_file)
+        if os.path.exists(container_file):
+            try:
+                with CorpusContainer(container_file) as container:
+                    if container.source and _signature_is_fresh(container.source, corpus_file):
+                        return container.section_text(difficulty_section)
+            except (OSError, ValueError, KeyError):
+                pass
+
+        with open(corpus_file, "rb") as f:
+            data = pickle.load(f)
+        self._write_corpus_container(data, corpus_file)
+        return self._extract_section_text(data, difficulty_section)
+
+    def create_corpus_from_text_files(self, output_file: str = "corpora/corpora.pkl", workers: Optional[int] = None) -> bool:
         try:
             corpus_data = {
                 "easy": "",
@@ -56,7 +793,10 @@ class Ngrams:
                     print(f"⚠️ Warning: {file_path} not found, skipping...")
                     corpus_data[difficulty] = f"Sample {difficulty} text for typing practice."
             
-            return self.save_corpus(corpus_data, output_file)
+            if not self.save_corpus(corpus_data, output_file):
+                return False
+            # the old artifacts are stale now; rebuild every section at once
+            return Ngrams(corpus_file=[output_file]).compile_model_artifacts(tuple(corpus_data), workers=workers)
             
         except Exception as e:
             print(f"❌ Error creating corpus: {e}")
@@ -71,9 +811,14 @@ class Ngrams:
             except FileNotFoundError:
                 existing_data = {"easy": "", "medium": "", "hard": ""}
             
+            previous_models = self._current_models(filename, difficulty)
+            old_data = dict(existing_data)
             existing_data[difficulty.lower()] = new_text
             
-            return self.save_corpus(existing_data, filename)
+            if not self.save_corpus(existing_data, filename):
+                return False
+            self._update_models_incrementally(filename, old_data, existing_data, previous_models)
+            return True
             
         except Exception as e:
             print(f"❌ Error updating corpus section: {e}")
@@ -88,20 +833,79 @@ class Ngrams:
             except FileNotFoundError:
                 existing_data = {"easy": "", "medium": "", "hard": ""}
             
+            previous_models = self._current_models(filename, difficulty)
+            old_data = dict(existing_data)
             current_text = existing_data.get(difficulty.lower(), "")
-            if current_text:
+            if isinstance(current_text, (list, tuple)):
+                updated_text = list(current_text) + [additional_text]
+            elif current_text:
                 updated_text = current_text + "\n\n" + additional_text
             else:
                 updated_text = additional_text
             
             existing_data[difficulty.lower()] = updated_text
             
-            return self.save_corpus(existing_data, filename)
+            if not self.save_corpus(existing_data, filename):
+                return False
+            self._update_models_incrementally(filename, old_data, existing_data, previous_models)
+            return True
             
         except Exception as e:
             print(f"❌ Error adding text to corpus: {e}")
             return False
 
+    def _current_models(self, filename: str, difficulty: str) -> Dict[str, List[Tuple[Optional[int], CompiledModel]]]:
+        """Up-to-date models of filename per section: the saved artifact (n None) and registry entries by n."""
+        if not os.path.exists(filename):
+            return {}
+        path_key = (os.path.abspath(filename),)
+        stat_key = (_stat_key(filename),)
+        current: Dict[str, List[Tuple[Optional[int], CompiledModel]]] = {}
+        for section in dict.fromkeys(("easy", "medium", "hard", difficulty.lower())):
+            models: List[Tuple[Optional[int], CompiledModel]] = []
+            artifact = Ngrams(corpus_file=[filename], n=2, difficulty=section).load_compiled_model()
+            if artifact is not None:
+                models.append((None, artifact))
+            for n in range(2, MODEL_MAX_ORDER + 1):
+                model = _model_registry.peek((path_key, stat_key, section, n))
+                if model is not None:
+                    models.append((n, model))
+            if models:
+                current[section] = models
+        return current
+
+    def _update_models_incrementally(self, filename: str, old_data: dict, new_data: dict,
+                                     previous_models: Dict[str, List[Tuple[Optional[int], CompiledModel]]]) -> None:
+        # Sections whose text only grew at the end get the new text merged into
+        # their models; anything else is left stale and rebuilt on demand.
+        sources = [_file_signature(filename)]
+        path_key = (os.path.abspath(filename),)
+        stat_key = (_stat_key(filename),)
+        for section, models in previous_models.items():
+            old_text = self._extract_section_text(old_data, section)
+            new_text = self._extract_section_text(new_data, section)
+            if new_text == old_text:
+                appended = ""
+            elif (old_text.strip() and new_text.startswith(old_text)
+                  and (old_text[-1].isspace() or new_text[len(old_text)].isspace())):
+                appended = new_text[len(old_text):]
+            else:
+                continue
+
+            extended: Dict[int, CompiledModel] = {}
+            updater = Ngrams(corpus_file=[filename], difficulty=section)
+            for n, model in models:
+                if id(model) not in extended:
+                    extended[id(model)] = updater.extend_compiled_model(model, appended, sources)
+                updated = extended[id(model)]
+                if n is None:
+                    updater.save_compiled_model(updated)
+                else:
+                    # replaces the entry for the old file signature, so running games pick it up
+                    _model_registry.get_or_build((path_key, stat_key, section, n), lambda: updated)
+            if appended:
+                print(f"⚡ Updated {section} model with {len(appended.split())} new words")
+
     def get_corpus_info(self, filename: str = "corpora/corpora.pkl") -> dict:
         try:
             with open(filename, "rb") as f:
@@ -141,6 +945,331 @@ class Ngrams:
         except Exception as e:
             return {"error": f"Error reading corpus: {e}"}
 
+    def _corpus_paths(self) -> List[str]:
+        if isinstance(self.corpus_file, (list, tuple)):
+            return [str(path) for path in self.corpus_file]
+        return [str(self.corpus_file)]
+
+    def model_artifact_path(self, section: Optional[str] = None) -> str:
+        paths = self._corpus_paths()
+        section = (section or self.difficulty).lower()
+        stem = "+".join(os.path.splitext(os.path.basename(p))[0] for p in paths)
+        return os.path.join(os.path.dirname(paths[0]), MODEL_DIR_NAME, f"{stem}.{section}.model.pkl")
+
+    def compile_model(self, section: str, max_order: int = MODEL_MAX_ORDER) -> CompiledModel:
+        section = section.lower()
+        sources = [_file_signature(p) for p in self._corpus_paths() if os.path.exists(p)]
+
+        # Every pass re-streams the corpus, so neither the text nor the full
+        # token list is held in memory; only counts are kept between passes.
+        def token_stream() -> Iterator[str]:
+            return self._iter_tokens(self.corpus_file, difficulty_section=section)
+
+        tail_state: dict = {}
+        token_counts = Counter(self._track_sentence_tail(token_stream(), max_order - 1, tail_state))
+        id_to_token = ["<START>", "<END>"] + sorted(tok for tok in token_counts if tok.isalpha())
+        _, models_by_order, unigram_counts = self._build_ngram_model(token_stream(), n=max_order, id_to_token=id_to_token)
+        shuffled_models = [
+            self._build_ngram_model(self._iter_shuffled_sentences(token_stream()), n=max_order, id_to_token=id_to_token)[1]
+            for _ in range(MODEL_SHUFFLED_VARIANTS)
+        ]
+        word_difficulty = dict(self._analyze_word_counts(token_counts))
+        return CompiledModel(
+            section=section,
+            max_order=max_order,
+            sources=sources,
+            token_counts=token_counts,
+            unigram_counts=unigram_counts,
+            id_to_token=id_to_token,
+            models_by_order=models_by_order,
+            shuffled_models=shuffled_models,
+            word_difficulty=word_difficulty,
+            tail=tail_state.get("tail", []),
+            ends_sentence=tail_state.get("ends_sentence", True),
+        )
+
+    def _track_sentence_tail(self, tokens: Iterable[str], size: int, state: dict,
+                             sentence: Iterable[str] = ()) -> Iterator[str]:
+        sentence = deque(sentence, maxlen=max(1, size))
+        previous = None
+        for tok in tokens:
+            if tok == "<START>":
+                sentence.clear()
+            elif tok == "<END>":
+                state["tail"] = list(sentence)[-size:] if size > 0 else []
+                state["ends_sentence"] = previous in (".", "!", "?")
+            elif tok.isalpha():
+                sentence.append(tok)
+            previous = tok
+            yield tok
+
+    def extend_compiled_model(self, model: CompiledModel, appended_text: str,
+                              sources: Optional[List[Dict[str, Union[str, int]]]] = None) -> CompiledModel:
+        """Return model as if appended_text (starting with whitespace) had been added to its section.
+
+        Only the new text is tokenized and counted, and its counts only touch the
+        table rows they change (see NgramTable.merge_counts), so the cost grows
+        with the new text rather than the old corpus. Two things still scale
+        with the model: folding a table's overlay once it has grown, which is
+        spread over many updates, and repacking every table when the vocabulary
+        outgrows the current id width, which costs about as much as a rebuild.
+        The word counters are copied and word difficulty is re-scored, which
+        scales with the vocabulary.
+        """
+        sources = model.sources if sources is None else sources
+        new_tokens = self._tokenize(appended_text)
+        if not new_tokens:
+            return replace(model, sources=sources)
+
+        # Without a closing . ! or ? the old last sentence runs on into the new text
+        merge = not model.ends_sentence
+        orders = range(2, model.max_order + 1)
+
+        token_counts = Counter(model.token_counts)
+        tail_state = {"tail": model.tail, "ends_sentence": model.ends_sentence}
+        token_counts.update(self._track_sentence_tail(
+            new_tokens[1:] if merge else new_tokens, model.max_order - 1, tail_state,
+            model.tail if merge else ()))
+        if merge:
+            token_counts["<END>"] -= 1
+
+        id_to_token = list(model.id_to_token)
+        known = set(id_to_token)
+        for tok in new_tokens:
+            if tok.isalpha() and tok not in known:
+                known.add(tok)
+                id_to_token.append(tok)
+        token_ids = {tok: i for i, tok in enumerate(id_to_token)}
+        bits = max(1, (len(id_to_token) - 1).bit_length())
+
+        ngram_counts: Dict[int, Counter] = {order: Counter() for order in orders}
+        unigram_counts = Counter(model.unigram_counts)
+        context = dict.fromkeys(orders, START_ID)
+        tokens: List[str] = new_tokens
+        if merge:
+            tail_ids = [token_ids[tok] for tok in model.tail]
+            for order in orders:
+                ctx_ids = ([START_ID] * (order - 1) + tail_ids)[-(order - 1):]
+                context[order] = _pack_ids(ctx_ids, bits)
+                # the old final <END> is no longer the end of that sentence
+                ngram_counts[order][(context[order] << bits) | END_ID] -= 1
+            unigram_counts["<END>"] -= 1
+            tokens = new_tokens[1:]
+        self._count_ngrams(tokens, token_ids, bits, orders, ngram_counts, unigram_counts, context)
+
+        def merged_tables(tables: NgramTables, deltas: Dict[int, Counter]) -> NgramTables:
+            merged = {}
+            for order in orders:
+                if tables[order].bits == bits:
+                    merged[order] = tables[order].merge_counts(deltas[order])
+                    continue
+                # the vocabulary outgrew the id width: every key has to be repacked
+                counts = tables[order].to_counts(bits)
+                for key, delta in deltas[order].items():
+                    counts[key] = counts.get(key, 0) + delta
+                merged[order] = NgramTable.from_counts(order, bits, {k: c for k, c in counts.items() if c > 0})
+            return merged
+
+        shuffled_models = []
+        for tables in model.shuffled_models:
+            # variants are random anyway: shuffle just the new sentences into them
+            deltas: Dict[int, Counter] = {order: Counter() for order in orders}
+            self._count_ngrams(self._iter_shuffled_sentences(new_tokens), token_ids, bits, orders,
+                               deltas, Counter(), dict.fromkeys(orders, START_ID))
+            shuffled_models.append(merged_tables(tables, deltas))
+
+        return replace(
+            model,
+            sources=sources,
+            token_counts=token_counts,
+            unigram_counts=unigram_counts,
+            id_to_token=id_to_token,
+            models_by_order=merged_tables(model.models_by_order, ngram_counts),
+            shuffled_models=shuffled_models,
+            word_difficulty=dict(self._analyze_word_counts(token_counts)),
+            tail=tail_state["tail"],
+            ends_sentence=tail_state["ends_sentence"],
+        )
+
+    def save_compiled_model(self, model: CompiledModel, filename: Optional[str] = None) -> bool:
+        filename = filename or self.model_artifact_path(model.section)
+        try:
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            data = model.to_dict()
+            _write_atomically(filename, lambda f: pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL))
+            return True
+        except Exception as e:
+            print(f"❌ Error saving model artifact: {e}")
+            return False
+
+    def compile_model_artifacts(self, sections: Tuple[str, ...] = ("easy", "medium", "hard"), max_order: int = MODEL_MAX_ORDER,
+                                workers: Optional[int] = None) -> bool:
+        try:
+            models = self.compile_models(sections, max_order=max_order, workers=workers)
+            for section, model in models.items():
+                filename = self.model_artifact_path(section)
+                if not self.save_compiled_model(model, filename):
+                    return False
+                print(f"🧠 Compiled {section} model ({len(model.vocabulary)} words, n ≤ {max_order}) to {filename}")
+            return True
+        except Exception as e:
+            print(f"❌ Error compiling models: {e}")
+            return False
+
+    def compile_models(self, sections: Tuple[str, ...] = ("easy", "medium", "hard"), max_order: int = MODEL_MAX_ORDER,
+                       workers: Optional[int] = None, shard_chars: int = BUILD_SHARD_CHARS) -> Dict[str, CompiledModel]:
+        """compile_model for several sections at once, spread over worker processes.
+
+        Each section is cut into shards of about shard_chars at word boundaries.
+        Workers tokenize and count the shards, first the vocabulary and then the
+        n-grams against the merged vocabulary, and the parent sums the counts.
+        The models are identical to compile_model's apart from the random
+        shuffled variants.
+        """
+        sections = tuple(dict.fromkeys(section.lower() for section in sections))
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            return {section: self.compile_model(section, max_order=max_order) for section in sections}
+
+        sources = [_file_signature(p) for p in self._corpus_paths() if os.path.exists(p)]
+        tail_size = max_order - 1
+        shards = {section: list(self._iter_section_shards(section, shard_chars)) for section in sections}
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scans = {
+                section: [executor.submit(_scan_shard, text, i > 0, i < len(texts) - 1, tail_size)
+                          for i, text in enumerate(texts)]
+                for section, texts in shards.items()
+            }
+            vocab: Dict[str, Tuple[Counter, List[List[str]], dict]] = {}
+            for section, futures in scans.items():
+                token_counts: Counter = Counter()
+                leads: List[List[str]] = []
+                lead: List[str] = []
+                tail_state = {"tail": [], "ends_sentence": True}
+                for future in futures:
+                    counts, tail, has_break, ends_sentence = future.result()
+                    leads.append(lead)
+                    token_counts.update(counts)
+                    lead = tail if has_break else (lead + tail)[-tail_size:] if tail_size else []
+                    if counts:
+                        tail_state = {"tail": lead, "ends_sentence": ends_sentence}
+                vocab[section] = (token_counts, leads, tail_state)
+
+            counts_futures = {}
+            for section, texts in shards.items():
+                token_counts, leads, _ = vocab[section]
+                id_to_token = ["<START>", "<END>"] + sorted(tok for tok in token_counts if tok.isalpha())
+                counts_futures[section] = (id_to_token, [
+                    executor.submit(_count_shard, text, i > 0, i < len(texts) - 1, leads[i], id_to_token, max_order)
+                    for i, text in enumerate(texts)
+                ])
+
+            models: Dict[str, CompiledModel] = {}
+            orders = range(2, max_order + 1)
+            for section, (id_to_token, futures) in counts_futures.items():
+                token_counts, _, tail_state = vocab[section]
+                bits = max(1, (len(id_to_token) - 1).bit_length())
+                ngram_counts = [{order: Counter() for order in orders} for _ in range(MODEL_SHUFFLED_VARIANTS + 1)]
+                unigram_counts: Counter = Counter()
+                for future in futures:
+                    shard_ngrams, shard_unigrams = future.result()
+                    unigram_counts.update(shard_unigrams)
+                    for merged, shard in zip(ngram_counts, shard_ngrams):
+                        for order in orders:
+                            merged[order].update(shard[order])
+                if "<END>" not in unigram_counts:
+                    unigram_counts["<END>"] = 1
+                tables = [{order: NgramTable.from_counts(order, bits, counts[order]) for order in orders}
+                          for counts in ngram_counts]
+                models[section] = CompiledModel(
+                    section=section,
+                    max_order=max_order,
+                    sources=sources,
+                    token_counts=token_counts,
+                    unigram_counts=unigram_counts,
+                    id_to_token=id_to_token,
+                    models_by_order=tables[0],
+                    shuffled_models=tables[1:],
+                    word_difficulty=dict(self._analyze_word_counts(token_counts)),
+                    tail=tail_state["tail"],
+                    ends_sentence=tail_state["ends_sentence"],
+                )
+        return models
+
+    def _iter_section_shards(self, section: str, shard_chars: int) -> Iterator[str]:
+        # Shards end where _last_word_break allows, so the tokens on either side
+        # of a cut are the same as in the whole text.
+        shard = None
+        buffer = ""
+        for chunk in self._iter_corpus_chunks(self.corpus_file, section):
+            buffer += chunk
+            if len(buffer) < shard_chars:
+                continue
+            cut = _last_word_break(buffer)
+            if cut:
+                if shard is not None:
+                    yield shard
+                shard, buffer = buffer[:cut], buffer[cut:]
+        # trailing whitespace alone would leave the last shard's sentence open
+        if shard is not None and not buffer.strip():
+            shard, buffer = shard + buffer, ""
+        if shard is not None:
+            yield shard
+        if buffer.strip():
+            yield buffer
+
+    def _shared_model_key(self) -> tuple:
+        paths = self._corpus_paths()
+        return (
+            tuple(os.path.abspath(p) for p in paths),
+            tuple(_stat_key(p) for p in paths),
+            self.difficulty,
+            max(2, int(self.n)),
+        )
+
+    def warm_shared_models(self, sections: Tuple[str, ...] = ("easy", "medium", "hard"), workers: Optional[int] = None) -> None:
+        """Make get_shared_model ready for every section, building missing models in parallel."""
+        missing = {}
+        for section in sections:
+            other = Ngrams(corpus_file=self.corpus_file, n=self.n, num_phrases=self.num_phrases, difficulty=section)
+            key = other._shared_model_key()
+            if _model_registry.peek(key) is not None:
+                continue
+            artifact = other.load_compiled_model()
+            if artifact is not None:
+                _model_registry.get_or_build(key, lambda: artifact)
+            else:
+                missing[other.difficulty] = key
+        if not missing:
+            return
+        built = self.compile_models(tuple(missing), max_order=max(2, int(self.n)), workers=workers)
+        for section, key in missing.items():
+            _model_registry.get_or_build(key, lambda: built[section])
+
+    def load_compiled_model(self, section: Optional[str] = None) -> Optional[CompiledModel]:
+        section = (section or self.difficulty).lower()
+        filename = self.model_artifact_path(section)
+        try:
+            with open(filename, "rb") as f:
+                model = CompiledModel.from_dict(pickle.load(f))
+        except (OSError, pickle.PickleError, ValueError, KeyError, EOFError, AttributeError):
+            return None
+        if model.section != section or model.max_order < max(2, int(self.n)):
+            return None
+        existing = [p for p in self._corpus_paths() if os.path.exists(p)]
+        if [os.path.abspath(p) for p in existing] != [src.get("path") for src in model.sources]:
+            return None
+        if not all(_signature_is_fresh(src, path) for src, path in zip(model.sources, existing)):
+            return None
+        return model
+
+    def get_shared_model(self) -> CompiledModel:
+        n = max(2, int(self.n))
+        return _model_registry.get_or_build(
+            self._shared_model_key(), lambda: self.load_compiled_model() or self.compile_model(self.difficulty, max_order=n)
+        )
+
     def _extract_section_text(self, data: Union[str, List, tuple, dict], section: Optional[str]) -> str:
         if section and isinstance(data, dict):
             lower_map = {str(k).lower(): k for k in data.keys()}
@@ -197,10 +1326,11 @@ class Ngrams:
 
     def _load_text(self, corpus_file: str, difficulty_section: Optional[str] = None) -> str:
         try:
-            if corpus_file.lower().endswith(".pkl"):
-                with open(corpus_file, "rb") as f:
-                    data = pickle.load(f)
-                    content = self._extract_section_text(data, difficulty_section)
+            if corpus_file.lower().endswith(CORPUS_CONTAINER_EXT):
+                with CorpusContainer(corpus_file) as container:
+                    content = container.section_text(difficulty_section)
+            elif corpus_file.lower().endswith(".pkl"):
+                content = self._load_pickle_section(corpus_file, difficulty_section)
             else:
                 with open(corpus_file, "r", encoding="utf-8") as f:
                     content = f.read()
@@ -218,100 +1348,185 @@ class Ngrams:
         except Exception as e:
             raise RuntimeError(f"Error loading corpus file: {e}")
 
-    def _tokenize(self, text: str, special_tokens: bool = True) -> List[str]:
-        if not text or not text.strip():
-            return []
-        
-        sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-        tokens = []
-        
-        for sent in sentences:
-            if not sent:
+    def _iter_text_chunks(self, corpus_file: str, difficulty_section: Optional[str] = None,
+                          chunk_size: int = TOKENIZE_CHUNK_SIZE) -> Iterator[str]:
+        try:
+            has_content = False
+            for chunk in self._iter_raw_chunks(corpus_file, difficulty_section, chunk_size):
+                has_content = has_content or not chunk.isspace()
+                yield chunk
+            if not has_content:
+                raise ValueError("Corpus file is empty.")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Corpus file '{corpus_file}' not found! Please ensure the file exists in the corpora directory.")
+        except pickle.PickleError as e:
+            raise ValueError(f"Invalid pickle file format: {e}. The corpus file may be corrupted.")
+        except PermissionError:
+            raise RuntimeError(f"Permission denied accessing '{corpus_file}'. Please check file permissions.")
+        except Exception as e:
+            raise RuntimeError(f"Error loading corpus file: {e}")
+
+    def _iter_raw_chunks(self, corpus_file: str, difficulty_section: Optional[str], chunk_size: int) -> Iterator[str]:
+        if corpus_file.lower().endswith(CORPUS_CONTAINER_EXT):
+            with CorpusContainer(corpus_file) as container:
+                yield from container.iter_section(difficulty_section, chunk_size)
+        elif corpus_file.lower().endswith(".pkl"):
+            container_file = self.corpus_container_path(corpus_file)
+            container = None
+            try:
+                container = CorpusContainer(container_file)
+                if not (container.source and _signature_is_fresh(container.source, corpus_file)):
+                    container.close()
+                    container = None
+            except (OSError, ValueError, KeyError):
+                container = None
+            if container is None:
+                yield self._load_pickle_section(corpus_file, difficulty_section)
+                return
+            with container:
+                yield from container.iter_section(difficulty_section, chunk_size)
+        else:
+            with open(corpus_file, "r", encoding="utf-8") as f:
+                for chunk in iter(lambda: f.read(chunk_size), ""):
+                    yield chunk
+
+    def _iter_corpus_chunks(self, corpus_file: Union[str, List[str]], difficulty_section: Optional[str] = None,
+                            chunk_size: int = TOKENIZE_CHUNK_SIZE) -> Iterator[str]:
+        if not isinstance(corpus_file, (list, tuple)):
+            yield from self._iter_text_chunks(corpus_file, difficulty_section, chunk_size)
+            return
+
+        # Files are joined with a newline, as if their texts were concatenated
+        first = True
+        for path in corpus_file:
+            chunks = self._iter_text_chunks(str(path), difficulty_section, chunk_size)
+            try:
+                head = next(chunks)
+            except (FileNotFoundError, StopIteration):
                 continue
-            
+            if not first:
+                yield "\n"
+            first = False
+            yield head
+            yield from chunks
+
+    def _iter_tokens_from_chunks(self, chunks: Iterable[str], special_tokens: bool = True) -> Iterator[str]:
+        """Tokenize text arriving in chunks exactly as _tokenize would tokenize the joined text."""
+        buffer = ""
+        scan_from = 0
+        in_sentence = False
+        for chunk in chunks:
+            if not buffer and not in_sentence:
+                chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            buffer += chunk
+
+            start = 0
+            for m in SENTENCE_BREAK_RE.finditer(buffer, scan_from):
+                if m.end() == len(buffer):
+                    # the whitespace run may continue in the next chunk
+                    break
+                if special_tokens and not in_sentence:
+                    yield "<START>"
+                yield from WORD_TOKEN_RE.findall(buffer, start, m.start())
+                if special_tokens:
+                    yield "<END>"
+                in_sentence = False
+                start = m.end()
+            buffer = buffer[start:]
+
+            # Emit the finished words of a long sentence instead of buffering it
+            cut = _last_word_break(buffer)
+            if cut:
+                if special_tokens and not in_sentence:
+                    yield "<START>"
+                in_sentence = True
+                yield from WORD_TOKEN_RE.findall(buffer, 0, cut)
+                buffer = buffer[cut:]
+            scan_from = _trailing_space_start(buffer)
+
+        buffer = buffer.rstrip()
+        start = 0
+        for m in SENTENCE_BREAK_RE.finditer(buffer):
+            if special_tokens and not in_sentence:
+                yield "<START>"
+            yield from WORD_TOKEN_RE.findall(buffer, start, m.start())
             if special_tokens:
-                tokens.append("<START>")
-            
-            words = re.findall(r"\w+|[^\w\s]", sent)
-            tokens.extend(words)
-            
+                yield "<END>"
+            in_sentence = False
+            start = m.end()
+        if in_sentence or start < len(buffer):
+            if special_tokens and not in_sentence:
+                yield "<START>"
+            yield from WORD_TOKEN_RE.findall(buffer, start)
             if special_tokens:
-                tokens.append("<END>")
-        
-        return tokens
+                yield "<END>"
 
-    def _get_tokens(self, corpus_file: Union[str, List[str]], difficulty_section: Optional[str] = None) -> List[str]:
-        if self._tokens_cache is not None:
-            return self._tokens_cache
-        
-        if isinstance(corpus_file, (list, tuple)):
-            combined_text_parts: List[str] = []
-            for path in corpus_file:
-                try:
-                    part = self._load_text(str(path), difficulty_section=difficulty_section)
-                    if part:
-                        combined_text_parts.append(str(part))
-                except FileNotFoundError:
-                    continue
-            text = "\n".join(combined_text_parts)
-        else:
-            text = self._load_text(corpus_file, difficulty_section=difficulty_section)
-        
-        tokens = self._tokenize(text, special_tokens=True)
-        
-        if random.random() < 0.2:
-            shuffled_tokens = []
-            current_sentence = []
-            for token in tokens:
-                if token == "<START>":
-                    if current_sentence:
-                        random.shuffle(current_sentence)
-                        shuffled_tokens.extend(current_sentence)
-                        current_sentence = []
-                    shuffled_tokens.append(token)
-                elif token == "<END>":
-                    current_sentence.append(token)
+    def _tokenize(self, text: str, special_tokens: bool = True) -> List[str]:
+        if not text or not text.strip():
+            return []
+        return list(self._iter_tokens_from_chunks([text], special_tokens))
+
+    def _iter_tokens(self, corpus_file: Union[str, List[str]], difficulty_section: Optional[str] = None) -> Iterator[str]:
+        return self._iter_tokens_from_chunks(self._iter_corpus_chunks(corpus_file, difficulty_section))
+
+    def _read_tokens(self, corpus_file: Union[str, List[str]], difficulty_section: Optional[str] = None) -> List[str]:
+        return list(self._iter_tokens(corpus_file, difficulty_section))
+
+    def _iter_shuffled_sentences(self, tokens: Iterable[str]) -> Iterator[str]:
+        current_sentence = []
+        for token in tokens:
+            if token == "<START>":
+                if current_sentence:
                     random.shuffle(current_sentence)
-                    shuffled_tokens.extend(current_sentence)
+                    yield from current_sentence
                     current_sentence = []
-                else:
-                    current_sentence.append(token)
-            
-            if current_sentence:
+                yield token
+            elif token == "<END>":
+                current_sentence.append(token)
                 random.shuffle(current_sentence)
-                shuffled_tokens.extend(current_sentence)
-            
-            tokens = shuffled_tokens
+                yield from current_sentence
+                current_sentence = []
+            else:
+                current_sentence.append(token)
         
-        self._tokens_cache = tokens
-        return tokens
+        if current_sentence:
+            random.shuffle(current_sentence)
+            yield from current_sentence
+
+    def _shuffle_sentences(self, tokens: List[str]) -> List[str]:
+        return list(self._iter_shuffled_sentences(tokens))
 
     def _analyze_word_difficulty(self, tokens: List[str]) -> Dict[str, str]:
         if self._word_difficulty_cache and self._tokens_analyzed == tokens:
             return self._word_difficulty_cache
 
-        filtered_tokens = [token for token in tokens 
-                          if token not in ["<START>", "<END>"] and len(token) > 1]
-        
-        word_counts = Counter(filtered_tokens)
+        word_difficulty = self._analyze_word_counts(Counter(tokens))
+        self._tokens_analyzed = tokens[:]
+        return word_difficulty
+
+    def _analyze_word_counts(self, token_counts: Counter) -> Dict[str, str]:
+        # keeps first-appearance order, which breaks ties between equal scores
+        word_counts = Counter({token: count for token, count in token_counts.items()
+                               if token not in ["<START>", "<END>"] and len(token) > 1})
         word_scores = self._calculate_word_complexity_scores(word_counts)
         word_difficulty = self._categorize_words_by_difficulty(word_scores)
         
         self._word_difficulty_cache = word_difficulty
-        self._tokens_analyzed = tokens[:]
         return word_difficulty
     
     def _calculate_word_complexity_scores(self, word_counts: Counter) -> dict:
         word_scores = {}
+        total_words = sum(word_counts.values())
         
         for word, count in word_counts.items():
             if len(word) < 2:
                 continue
                 
             length_score = self._calculate_length_score(word)
-            freq_score = self._calculate_frequency_score(word, count, word_counts)
-            complexity_score = self._calculate_pattern_complexity_score(word)
-            syllable_score = self._calculate_syllable_score(word)
+            freq_score = self._calculate_frequency_score(count, total_words)
+            complexity_score, syllable_score = self._calculate_pattern_and_syllable_scores(word)
             
             total_score = length_score + freq_score + complexity_score + syllable_score
             word_scores[word] = total_score
@@ -321,32 +1536,29 @@ class Ngrams:
     def _calculate_length_score(self, word: str) -> float:
         return len(word) * 0.3
     
-    def _calculate_frequency_score(self, word: str, count: int, word_counts: Counter) -> float:
-        total_words = sum(word_counts.values())
+    def _calculate_frequency_score(self, count: int, total_words: int) -> float:
         return (1 - (count / total_words)) * 5
     
-    def _calculate_pattern_complexity_score(self, word: str) -> float:
+    def _calculate_pattern_and_syllable_scores(self, word: str) -> Tuple[float, float]:
         complexity_score = 0.0
+        consonant_run = 0
         consonants = 0
+        vowels = 0
         
         for char in word.lower():
             if char in 'aeiou':
-                consonants = 0
+                consonant_run = 0
+                vowels += 1
             elif char.isalpha():
+                consonant_run += 1
                 consonants += 1
-                if consonants >= 3:
+                if consonant_run >= 3:
                     complexity_score += 1.0
             else:
                 complexity_score += 0.5
         
-        return complexity_score
-    
-    def _calculate_syllable_score(self, word: str) -> float:
-        consonants = sum(1 for char in word.lower() if char.isalpha() and char not in 'aeiou')
-        vowels = sum(1 for char in word.lower() if char in 'aeiou')
-        
         syllable_count = max(1, (consonants + vowels) // 3)
-        return syllable_count * 0.5
+        return complexity_score, syllable_count * 0.5
     
     def _categorize_words_by_difficulty(self, word_scores: dict) -> dict:
         sorted_words = sorted(word_scores.items(), key=lambda x: x[1])
@@ -371,23 +1583,39 @@ class Ngrams:
         
         random.seed()
         
-        tokens = self._get_tokens(self.corpus_file, difficulty_section=self.difficulty)
-        return self._generate_phrases(tokens, self.num_phrases)
+        return self._generate_phrases_from_compiled(self.get_shared_model(), self.num_phrases)
+
+    def _generate_phrases_from_compiled(self, compiled: CompiledModel, num_phrases: int) -> List[str]:
+        if compiled.total_tokens < max(2, self.n):
+            return self._generate_fallback_phrases(compiled.token_counts, num_phrases)
 
-    def _generate_phrases(self, tokens: List[str], num_phrases: int) -> List[str]:
-        if len(tokens) < max(2, self.n):
-            return self._generate_fallback_phrases(tokens, num_phrases)
+        self._word_difficulty_cache = dict(compiled.word_difficulty)
 
-        self._analyze_word_difficulty(tokens)
+        models_by_order = compiled.models_by_order
+        if compiled.shuffled_models and random.random() < 0.2:
+            models_by_order = random.choice(compiled.shuffled_models)
 
-        models_by_order, unigram_counts = self._build_ngram_model(tokens)
+        return self._sample_phrases(
+            compiled.id_to_token,
+            models_by_order,
+            compiled.unigram_counts,
+            num_phrases,
+            lambda: self._generate_fallback_phrases(compiled.token_counts, 1)[0],
+        )
 
-        def in_length_range(length: int) -> bool:
-            if self.difficulty == "easy":
-                return length <= 4
-            if self.difficulty == "medium":
-                return 5 <= length <= 7
-            return length >= 8
+    def _in_length_range(self, length: int) -> bool:
+        # word lengths the difficulty samples from
+        if self.difficulty == "easy":
+            return length <= 4
+        if self.difficulty == "medium":
+            return 5 <= length <= 7
+        return length >= 8
+
+    def _sample_phrases(self, id_to_token: List[str], models_by_order: NgramTables, unigram_counts: Counter,
+                        num_phrases: int, fallback_fn) -> List[str]:
+        in_length_range = self._in_length_range
+        n = max(2, int(self.n))
+        sampler = NgramSampler(id_to_token, models_by_order, unigram_counts, n, self._get_interpolation_weights(n), in_length_range)
 
         phrases: List[str] = []
         used_phrases = set()
@@ -397,9 +1625,9 @@ class Ngrams:
             max_attempts = 10
             
             for attempt in range(max_attempts):
-                phrase_words = self._generate_phrase_with_model(models_by_order, unigram_counts, target_len, in_length_range)
+                phrase_words = self._generate_phrase_with_model(sampler, target_len, in_length_range)
                 if not phrase_words:
-                    fallback_phrase = self._generate_fallback_phrases(tokens, 1)[0]
+                    fallback_phrase = fallback_fn()
                     if fallback_phrase not in used_phrases:
                         phrases.append(fallback_phrase)
                         used_phrases.add(fallback_phrase)
@@ -422,46 +1650,52 @@ class Ngrams:
         
         return phrases
 
-    def _build_ngram_model(self, tokens: List[str]) -> Tuple[Dict[int, Dict[Tuple[str, ...], Counter]], Counter]:
-        cleaned: List[str] = []
-        for t in tokens:
-            if t in ("<START>", "<END>"):
-                cleaned.append(t)
-            elif t.isalpha():
-                cleaned.append(t)
-        n = max(2, int(self.n))
-        models_by_order: Dict[int, Dict[Tuple[str, ...], Counter]] = {k: {} for k in range(2, n + 1)}
-        unigram_counts: Counter = Counter()
+    def _build_ngram_model(self, tokens: Iterable[str], n: Optional[int] = None,
+                           id_to_token: Optional[List[str]] = None) -> Tuple[List[str], NgramTables, Counter]:
+        n = max(2, int(self.n if n is None else n))
 
-        context: List[str] = []
-        for tok in cleaned:
-            if tok == "<START>":
-                context = ["<START>"] * (n - 1)
-                continue
-            if not context:
-                context = ["<START>"] * (n - 1)
-
-            if tok != "<START>":
-                unigram_counts[tok] += 1
+        if id_to_token is None:
+            tokens = list(tokens)
+            id_to_token = ["<START>", "<END>"] + sorted({t for t in tokens if t.isalpha()})
+        token_ids = {tok: i for i, tok in enumerate(id_to_token)}
+        bits = max(1, (len(id_to_token) - 1).bit_length())
 
-            for order in range(2, n + 1):
-                ctx_tuple = tuple(context[-(order - 1):]) if order > 1 else tuple()
-                bucket = models_by_order[order]
-                bucket.setdefault(ctx_tuple, Counter())[tok] += 1
-
-            context.append(tok)
-            if tok == "<END>":
-                context = []
+        orders = range(2, n + 1)
+        ngram_counts: Dict[int, Counter] = {order: Counter() for order in orders}
+        unigram_counts: Counter = Counter()
+        self._count_ngrams(tokens, token_ids, bits, orders, ngram_counts, unigram_counts, dict.fromkeys(orders, START_ID))
 
         if "<END>" not in unigram_counts:
             unigram_counts["<END>"] = 1
 
-        return models_by_order, unigram_counts
+        models_by_order = {order: NgramTable.from_counts(order, bits, ngram_counts[order]) for order in orders}
+        return id_to_token, models_by_order, unigram_counts
+
+    def _count_ngrams(self, tokens: Iterable[str], token_ids: Dict[str, int], bits: int, orders: range,
+                      ngram_counts: Dict[int, Counter], unigram_counts: Counter, context: Dict[int, int]) -> None:
+        # context holds the packed context per order; all-zero means a run of <START> padding
+        masks = {order: (1 << (bits * (order - 1))) - 1 for order in orders}
+        for tok in tokens:
+            if tok == "<START>":
+                context = dict.fromkeys(orders, START_ID)
+                continue
+            if tok != "<END>" and not tok.isalpha():
+                continue
+
+            unigram_counts[tok] += 1
+            token_id = token_ids[tok]
+            for order in orders:
+                ngram_counts[order][(context[order] << bits) | token_id] += 1
+
+            if token_id == END_ID:
+                context = dict.fromkeys(orders, START_ID)
+            else:
+                for order in orders:
+                    context[order] = ((context[order] << bits) | token_id) & masks[order]
 
     def _generate_phrase_with_model(
         self,
-        models_by_order: Dict[int, Dict[Tuple[str, ...], Counter]],
-        unigram_counts: Counter,
+        sampler: NgramSampler,
         target_words: int,
         in_length_range_fn,
     ) -> List[str]:
@@ -469,9 +1703,8 @@ class Ngrams:
         words: List[str] = []
         
         if random.random() < 0.3:
-            all_words = [tok for tok in unigram_counts.keys() if tok.isalpha() and tok not in ["<START>", "<END>"]]
-            if all_words:
-                random_start = random.choice(all_words)
+            if sampler.start_words:
+                random_start = random.choice(sampler.start_words)
                 context = [random_start] + ["<START>"] * (n - 2) if n > 2 else [random_start]
             else:
                 context = ["<START>"] * (n - 1)
@@ -482,7 +1715,7 @@ class Ngrams:
 
         for _ in range(max_steps):
             ctx_tuple = tuple(context[-(n - 1):]) if n > 1 else tuple()
-            next_token = self._sample_next_token(ctx_tuple, models_by_order, unigram_counts, in_length_range_fn)
+            next_token = sampler.sample(ctx_tuple)
             if next_token is None:
                 break
             if next_token == "<END>":
@@ -498,64 +1731,6 @@ class Ngrams:
                 break
         return words
 
-    def _sample_next_token(
-        self,
-        ctx: Tuple[str, ...],
-        models_by_order: Dict[int, Dict[Tuple[str, ...], Counter]],
-        unigram_counts: Counter,
-        in_length_range_fn,
-    ) -> Optional[str]:
-        n = max(2, int(self.n))
-        lambdas = self._get_interpolation_weights(n)
-
-        candidates = list(unigram_counts.keys())
-        if not candidates:
-            return None
-
-        total_unigrams = sum(unigram_counts.values()) or 1
-
-        ctx_lists: Dict[int, Tuple[str, ...]] = {}
-        for order in range(2, n + 1):
-            ctx_lists[order] = tuple(ctx[-(order - 1):]) if (order - 1) > 0 else tuple()
-
-        scores: Dict[str, float] = {}
-        for tok in candidates:
-            p = lambdas[1] * (unigram_counts.get(tok, 0) / total_unigrams)
-            for order in range(2, n + 1):
-                weight = lambdas[order]
-                if weight <= 0:
-                    continue
-                dist = models_by_order.get(order, {}).get(ctx_lists[order])
-                if dist:
-                    denom = sum(dist.values()) or 1
-                    p += weight * (dist.get(tok, 0) / denom)
-            p += random.uniform(0, 0.01)
-            scores[tok] = p
-
-        good_tokens = [t for t in candidates if t == "<END>" or (t.isalpha() and in_length_range_fn(len(t)))]
-        pool = good_tokens if good_tokens else candidates
-
-        temperature = 1.2 + random.uniform(0, 0.3)
-        
-        if temperature != 1.0:
-            for tok in pool:
-                scores[tok] = scores.get(tok, 0.0) ** (1.0 / temperature)
-
-        total = sum(scores.get(t, 0.0) for t in pool)
-        if total <= 0:
-            return random.choice(pool)
-
-        if random.random() < 0.1:
-            return random.choice(pool)
-
-        r = random.random() * total
-        upto = 0.0
-        for t in pool:
-            upto += scores.get(t, 0.0)
-            if upto >= r:
-                return t
-        return pool[-1]
-
     def _get_interpolation_weights(self, n: int) -> Dict[int, float]:
         if n <= 2:
             return {1: 0.3, 2: 0.7}
@@ -607,10 +1782,11 @@ class Ngrams:
             phrases.append(" ".join(sampled))
         return phrases
 
-    def _generate_fallback_phrases(self, tokens: List[str], num_phrases: int) -> List[str]:
-        tokens_copy = tokens[:]
-        random.shuffle(tokens_copy)
-        fallback = " ".join(tokens_copy[:10]) if tokens_copy else ""
+    def _generate_fallback_phrases(self, token_counts: Counter, num_phrases: int) -> List[str]:
+        population = list(token_counts.keys())
+        counts = list(token_counts.values())
+        sampled = random.sample(population, min(10, sum(counts)), counts=counts) if population else []
+        fallback = " ".join(sampled)
         return [fallback for _ in range(num_phrases)]
 
     def _get_target_phrase_length(self) -> int:
@@ -633,15 +1809,13 @@ class Ngrams:
             return " ".join(phrase_words) + " " + random.choice(["now", "here", "there", "then", "soon"])
 
     def get_word_frequencies(self, top_k: int = 20) -> List[Tuple[str, int]]:
-        tokens = self._get_tokens(self.corpus_file, difficulty_section=self.difficulty)
-        filtered_tokens = [token for token in tokens 
-                          if token not in ["<START>", "<END>"]]
-        word_counts = Counter(filtered_tokens)
+        compiled = self.get_shared_model()
+        word_counts = Counter({tok: count for tok, count in compiled.token_counts.items()
+                               if tok not in ["<START>", "<END>"]})
         return word_counts.most_common(top_k)
 
     def get_difficulty_stats(self) -> dict:
-        tokens = self._get_tokens(self.corpus_file, difficulty_section=self.difficulty)
-        self._analyze_word_difficulty(tokens)
+        self._word_difficulty_cache = dict(self.get_shared_model().word_difficulty)
         return self._get_difficulty_stats()
 
     def _get_difficulty_stats(self) -> Dict[str, Dict]:
@@ -668,28 +1842,74 @@ class Ngrams:
         }
 
     def get_model_stats(self) -> dict:
-        tokens = self._get_tokens(self.corpus_file, difficulty_section=self.difficulty)
-        
-        filtered_tokens = [token for token in tokens 
-                          if token not in ["<START>", "<END>"]]
+        compiled = self.get_shared_model()
+        unique_words = len(compiled.vocabulary)
         
         return {
-            "total_tokens": len(tokens),
-            "unique_words": len(set(filtered_tokens)),
+            "total_tokens": compiled.total_tokens,
+            "unique_words": unique_words,
             "n_gram_order": self.n,
-            "vocabulary_size": len(set(filtered_tokens)),
+            "vocabulary_size": unique_words,
             "difficulty": self.difficulty,
             "difficulty_stats": self.get_difficulty_stats()
         }
     
     def clear_cache(self):
         self._text_cache = None
-        self._tokens_cache = None
         self._word_difficulty_cache.clear()
         self._tokens_analyzed.clear()
         self._difficulty_words_cache = None
 
 
+def _shard_tokens(text: str, continues: bool, open_end: bool) -> List[str]:
+    tokens = Ngrams()._tokenize(text)
+    # a shard cut mid-sentence must not start or end a sentence there
+    if tokens and continues:
+        tokens = tokens[1:]
+    if tokens and open_end:
+        tokens = tokens[:-1]
+    return tokens
+
+
+def _scan_shard(text: str, continues: bool, open_end: bool, tail_size: int) -> Tuple[Counter, List[str], bool, bool]:
+    """Worker: token counts of a shard and the words its last sentence ends with."""
+    tokens = _shard_tokens(text, continues, open_end)
+    state = {"tail": [], "ends_sentence": True}
+    # closing the shard's last sentence only records its tail
+    counts = Counter(Ngrams()._track_sentence_tail(tokens + ["<END>"] * open_end, tail_size, state))
+    if open_end:
+        counts["<END>"] -= 1
+        if counts["<END>"] <= 0:
+            del counts["<END>"]
+    return counts, state["tail"], "<START>" in counts, state["ends_sentence"]
+
+
+def _count_shard(text: str, continues: bool, open_end: bool, lead: List[str], id_to_token: List[str],
+                 max_order: int) -> Tuple[List[Dict[int, Counter]], Counter]:
+    """Worker: packed n-gram counts of a shard, then of MODEL_SHUFFLED_VARIANTS shuffles of it."""
+    builder = Ngrams()
+    tokens = _shard_tokens(text, continues, open_end)
+    token_ids = {tok: i for i, tok in enumerate(id_to_token)}
+    bits = max(1, (len(id_to_token) - 1).bit_length())
+    orders = range(2, max_order + 1)
+
+    lead_ids = [token_ids[tok] for tok in lead]
+    context = {order: _pack_ids(([START_ID] * (order - 1) + lead_ids)[-(order - 1):], bits) for order in orders}
+    ngram_counts: Dict[int, Counter] = {order: Counter() for order in orders}
+    unigram_counts: Counter = Counter()
+    builder._count_ngrams(tokens, token_ids, bits, orders, ngram_counts, unigram_counts, context)
+
+    # forked workers inherit the parent's generator state
+    random.seed()
+    variants = [ngram_counts]
+    for _ in range(MODEL_SHUFFLED_VARIANTS):
+        shuffled: Dict[int, Counter] = {order: Counter() for order in orders}
+        builder._count_ngrams(builder._iter_shuffled_sentences(tokens), token_ids, bits, orders,
+                              shuffled, Counter(), dict.fromkeys(orders, START_ID))
+        variants.append(shuffled)
+    return variants, unigram_counts
+
+
 def print_menu(title: str, options: List[str]) -> None:
     print(f"\n--- {title} ---")
     for i, option in enumerate(options, 1):
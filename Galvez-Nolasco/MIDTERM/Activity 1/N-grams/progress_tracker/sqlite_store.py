@@ -0,0 +1,196 @@
+import sqlite3
+import datetime
+from typing import Dict, List
+
+from .tracker import HISTORY_LIMIT
+
+RESULT_FIELDS = [
+    "wpm", "accuracy", "characters_typed", "total_characters", "time_taken",
+    "date_taken", "difficulty", "n_gram_order", "test_duration",
+]
+STORE_VERSION = "3.1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_tests INTEGER NOT NULL DEFAULT 0,
+    best_wpm REAL NOT NULL DEFAULT 0,
+    best_accuracy REAL NOT NULL DEFAULT 0,
+    total_characters INTEGER NOT NULL DEFAULT 0,
+    total_time REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS test_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    wpm REAL NOT NULL,
+    accuracy REAL NOT NULL,
+    characters_typed INTEGER NOT NULL,
+    total_characters INTEGER NOT NULL,
+    time_taken REAL NOT NULL,
+    date_taken TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    n_gram_order INTEGER NOT NULL,
+    test_duration INTEGER NOT NULL
+);
+DROP INDEX IF EXISTS idx_results_date;
+CREATE INDEX IF NOT EXISTS idx_results_difficulty ON test_results (difficulty, n_gram_order);
+"""
+
+
+class SqliteProgressStore:
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._conn = sqlite3.connect(db_file)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            self._conn.execute("INSERT OR IGNORE INTO totals (id) VALUES (1)")
+            if self._meta().get("version", STORE_VERSION) < STORE_VERSION:
+                # difficulty is stored lowercase so grouping can use its index
+                self._conn.execute("UPDATE test_results SET difficulty = LOWER(difficulty)")
+                self._set_meta("version", STORE_VERSION)
+
+    def close(self):
+        self._conn.close()
+
+    def is_initialized(self) -> bool:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'created_date'").fetchone()
+        return row is not None
+
+    def _today(self) -> str:
+        return datetime.datetime.now().strftime('%Y-%m-%d')
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _row(self, record: Dict) -> tuple:
+        values = {name: record.get(name) for name in RESULT_FIELDS}
+        values["difficulty"] = str(values["difficulty"] or "").lower()
+        return tuple(values[name] for name in RESULT_FIELDS)
+
+    def _trim_history(self):
+        self._conn.execute(
+            "DELETE FROM test_results WHERE id <= "
+            "(SELECT id FROM test_results ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (HISTORY_LIMIT,),
+        )
+
+    def replace_all(self, data: Dict):
+        history = data.get("test_history", [])
+        with self._conn:
+            self._conn.execute("DELETE FROM test_results")
+            self._conn.executemany(
+                f"INSERT INTO test_results ({', '.join(RESULT_FIELDS)}) "
+                f"VALUES ({', '.join('?' for _ in RESULT_FIELDS)})",
+                [self._row(test) for test in history],
+            )
+            self._trim_history()
+            self._conn.execute(
+                "UPDATE totals SET total_tests = ?, best_wpm = ?, best_accuracy = ?, "
+                "total_characters = ?, total_time = ? WHERE id = 1",
+                (
+                    data.get("total_tests", len(history)),
+                    data.get("best_wpm", 0.0),
+                    data.get("best_accuracy", 0.0),
+                    data.get("total_characters", 0),
+                    data.get("total_time", 0.0),
+                ),
+            )
+            created = data.get("created_date") or self._today()
+            self._set_meta("version", STORE_VERSION)
+            self._set_meta("created_date", created)
+            self._set_meta("last_modified", data.get("last_modified") or created)
+
+    def add_result(self, record: Dict):
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO test_results ({', '.join(RESULT_FIELDS)}) "
+                f"VALUES ({', '.join('?' for _ in RESULT_FIELDS)})",
+                self._row(record),
+            )
+            self._conn.execute(
+                "UPDATE totals SET total_tests = total_tests + 1, "
+                "best_wpm = MAX(best_wpm, ?), best_accuracy = MAX(best_accuracy, ?), "
+                "total_characters = total_characters + ?, total_time = total_time + ? WHERE id = 1",
+                (record["wpm"], record["accuracy"], record["characters_typed"], record["time_taken"]),
+            )
+            self._trim_history()
+            self._set_meta("last_modified", self._today())
+
+    def _meta(self) -> Dict[str, str]:
+        return {row["key"]: row["value"] for row in self._conn.execute("SELECT key, value FROM meta")}
+
+    def _recent(self, limit: int) -> List[Dict]:
+        rows = self._conn.execute(
+            f"SELECT {', '.join(RESULT_FIELDS)} FROM test_results ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def totals(self) -> Dict:
+        row = self._conn.execute(
+            "SELECT t.total_tests, t.best_wpm, t.best_accuracy, t.total_characters, t.total_time, "
+            "(SELECT AVG(wpm) FROM test_results) AS average_wpm, "
+            "(SELECT AVG(accuracy) FROM test_results) AS average_accuracy "
+            "FROM totals t WHERE t.id = 1"
+        ).fetchone()
+        return {
+            "total_tests": row["total_tests"],
+            "best_wpm": row["best_wpm"],
+            "best_accuracy": row["best_accuracy"],
+            "average_wpm": round(row["average_wpm"], 1) if row["average_wpm"] is not None else 0.0,
+            "average_accuracy": round(row["average_accuracy"], 1) if row["average_accuracy"] is not None else 0.0,
+            "total_characters": row["total_characters"],
+            "total_time": row["total_time"],
+        }
+
+    def load_data(self) -> Dict:
+        meta = self._meta()
+        data = {"version": meta.get("version", STORE_VERSION), "created_date": meta.get("created_date")}
+        data.update(self.totals())
+        data["test_history"] = self._recent(HISTORY_LIMIT)
+        data["last_modified"] = meta.get("last_modified")
+        return data
+
+    def progress_summary(self) -> Dict:
+        recent = self._conn.execute(
+            "SELECT AVG(wpm) AS wpm, AVG(accuracy) AS accuracy FROM "
+            "(SELECT wpm, accuracy FROM test_results ORDER BY id DESC LIMIT 10)"
+        ).fetchone()
+        summary = self.totals()
+        summary["recent_average_wpm"] = round(recent["wpm"], 1) if recent["wpm"] is not None else 0
+        summary["recent_average_accuracy"] = round(recent["accuracy"], 1) if recent["accuracy"] is not None else 0
+        summary["test_history"] = self._recent(50)
+        return summary
+
+    def difficulty_stats(self) -> Dict:
+        result = {
+            diff: {"count": 0, "average_wpm": 0, "average_accuracy": 0, "best_wpm": 0, "best_accuracy": 0}
+            for diff in ("easy", "medium", "hard")
+        }
+        rows = self._conn.execute(
+            "SELECT difficulty AS diff, COUNT(*) AS count, AVG(wpm) AS average_wpm, "
+            "AVG(accuracy) AS average_accuracy, MAX(wpm) AS best_wpm, MAX(accuracy) AS best_accuracy "
+            "FROM test_results GROUP BY difficulty"
+        )
+        for row in rows:
+            if row["diff"] in result:
+                result[row["diff"]] = {
+                    "count": row["count"],
+                    "average_wpm": round(row["average_wpm"], 1),
+                    "average_accuracy": round(row["average_accuracy"], 1),
+                    "best_wpm": row["best_wpm"],
+                    "best_accuracy": row["best_accuracy"],
+                }
+        return result
+
+    def chart_data(self, limit: int = 30) -> Dict:
+        recent = self._recent(limit)
+        return {
+            "dates": [test["date_taken"] for test in recent],
+            "wpms": [test["wpm"] for test in recent],
+            "accuracies": [test["accuracy"] for test in recent],
+            "characters": [test["characters_typed"] for test in recent],
+        }
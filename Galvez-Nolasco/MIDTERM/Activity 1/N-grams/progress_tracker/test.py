@@ -20,24 +20,162 @@ def test_basic_functionality():
         data = tracker._load_data()
         print("✅ Data loading successful")
         
-        # Clean up test file
+        # Clean up test files
         import os
-        if os.path.exists("test_progress.json"):
-            os.remove("test_progress.json")
+        for path in ("test_progress.json", "test_progress.jsonl"):
+            if os.path.exists(path):
+                os.remove(path)
         
         return True
     except Exception as e:
         print(f"❌ Basic functionality test failed: {e}")
         return False
 
+def _make_result(wpm):
+    from .tracker import TypingTestResult
+    return TypingTestResult(wpm=wpm, accuracy=90.0, characters_typed=100, total_characters=120,
+                            time_taken=60.0, date_taken="2024-01-01", difficulty="easy",
+                            n_gram_order=3, test_duration=60)
+
+def test_log_storage():
+    import json
+    import os
+    import tempfile
+    from . import tracker as tracker_module
+    from .tracker import ProgressTracker, HEADER_SIZE
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Migration from the legacy JSON document
+            legacy = os.path.join(tmp, "progress.json")
+            with open(legacy, "w", encoding="utf-8") as f:
+                json.dump({"created_date": "2023-01-01", "total_tests": 5, "best_wpm": 80.0, "best_accuracy": 99.0,
+                           "total_characters": 500, "total_time": 300.0,
+                           "test_history": [{"wpm": 40.0, "accuracy": 95.0, "difficulty": "easy"}]}, f)
+            tracker = ProgressTracker(legacy)
+            data = tracker._load_data()
+            assert data["total_tests"] == 5 and len(data["test_history"]) == 1
+            print("✅ Legacy file migrated")
+            
+            # Appends update the header totals
+            tracker.save_test_result(_make_result(50.0))
+            data = tracker._load_data()
+            assert data["total_tests"] == 6 and data["average_wpm"] == 45.0
+            with open(tracker.log_file, "rb") as f:
+                assert json.loads(f.read(HEADER_SIZE))["end"] == os.path.getsize(tracker.log_file)
+            print("✅ Results appended to the log")
+            
+            # A record appended without its header update is counted on the next read
+            with open(tracker.log_file, "ab") as f:
+                f.write((json.dumps({"wpm": 60.0, "accuracy": 90.0, "characters_typed": 10,
+                                     "time_taken": 5.0, "difficulty": "easy"}) + "\n").encode("utf-8"))
+            data = tracker._load_data()
+            assert data["total_tests"] == 7 and data["total_characters"] == 610
+            assert data["average_wpm"] == 50.0 and len(data["test_history"]) == 3
+            tracker.save_test_result(_make_result(70.0))
+            assert tracker._load_data()["total_tests"] == 8
+            print("✅ Header reconciled with unaccounted records")
+            
+            # A torn line is skipped, the legacy file is never read again
+            with open(tracker.log_file, "ab") as f:
+                f.write(b'{"wpm": 1')
+            os.remove(legacy)
+            data = tracker._load_data()
+            assert data["total_tests"] == 8 and len(data["test_history"]) == 4
+            tracker.save_test_result(_make_result(30.0))
+            assert len(tracker._load_data()["test_history"]) == 5
+            print("✅ Torn line skipped")
+            
+            # A damaged header is rebuilt from the records
+            with open(tracker.log_file, "r+b") as f:
+                f.write(b"garbage")
+            data = tracker._load_data()
+            assert data["total_tests"] == 5 and data["best_wpm"] == 70.0
+            assert not os.path.exists(legacy)
+            print("✅ Header rebuilt from records")
+            
+            # Compaction keeps the newest records and the all-time totals
+            limit, slack = tracker_module.HISTORY_LIMIT, tracker_module.COMPACTION_SLACK
+            tracker_module.HISTORY_LIMIT, tracker_module.COMPACTION_SLACK = 3, 1
+            try:
+                tracker.save_test_result(_make_result(90.0))
+            finally:
+                tracker_module.HISTORY_LIMIT, tracker_module.COMPACTION_SLACK = limit, slack
+            data = tracker._load_data()
+            assert data["total_tests"] == 6 and [t["wpm"] for t in data["test_history"]] == [70.0, 30.0, 90.0]
+            assert data["average_wpm"] == 63.3
+            print("✅ Log compacted")
+        return True
+    except Exception as e:
+        print(f"❌ Log storage test failed: {e!r}")
+        return False
+
+def test_sqlite_storage():
+    import os
+    import random
+    import tempfile
+    from . import tracker as tracker_module
+    from . import sqlite_store
+    from .tracker import ProgressTracker
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Seeding from an existing log
+            path = os.path.join(tmp, "progress.json")
+            log_tracker = ProgressTracker(path)
+            rng = random.Random(9)
+            for i in range(12):
+                result = _make_result(round(rng.uniform(20, 90), 1))
+                result.accuracy = round(rng.uniform(70, 100), 1)
+                result.difficulty = rng.choice(["easy", "Medium", "HARD"])
+                log_tracker.save_test_result(result)
+            tracker = ProgressTracker(path, storage="sqlite")
+            expected, data = log_tracker._load_data(), tracker._load_data()
+            for key in ("total_tests", "best_wpm", "best_accuracy", "average_wpm", "average_accuracy", "total_characters"):
+                assert data[key] == expected[key], key
+            assert [t["wpm"] for t in data["test_history"]] == [t["wpm"] for t in expected["test_history"]]
+            print("✅ Database seeded from the log")
+            
+            # add_result keeps the same totals as the log
+            for wpm in (55.5, 95.0):
+                log_tracker.save_test_result(_make_result(wpm))
+                tracker.save_test_result(_make_result(wpm))
+            summary, expected_summary = tracker.get_progress_summary(), log_tracker.get_progress_summary()
+            for key in ("total_tests", "best_wpm", "average_wpm", "recent_average_wpm", "recent_average_accuracy"):
+                assert summary[key] == expected_summary[key], key
+            print("✅ Results added")
+            
+            # Per-difficulty stats match the JSONL tracker, whatever the case of the difficulty
+            assert tracker.get_difficulty_stats() == log_tracker.get_difficulty_stats()
+            print("✅ Difficulty stats match the log")
+            
+            # History is trimmed to the limit while the all-time totals keep counting
+            limit = tracker_module.HISTORY_LIMIT
+            sqlite_store.HISTORY_LIMIT = 5
+            try:
+                tracker.save_test_result(_make_result(10.0))
+            finally:
+                sqlite_store.HISTORY_LIMIT = limit
+            data = tracker._load_data()
+            assert len(data["test_history"]) == 5 and data["total_tests"] == 15
+            assert data["test_history"][-1]["wpm"] == 10.0
+            print("✅ History trimmed")
+            tracker._db.close()
+        return True
+    except Exception as e:
+        print(f"❌ SQLite storage test failed: {e!r}")
+        return False
+
 if __name__ == "__main__":
     print("🧪 Testing Progress Tracker Package")
     print("=" * 40)
     
     test1 = test_imports()
     test2 = test_basic_functionality()
+    test3 = test_log_storage()
+    test4 = test_sqlite_storage()
     
-    if test1 and test2:
+    if test1 and test2 and test3 and test4:
         print("\n🎉 All tests passed!")
     else:
         print("\n⚠️  Some tests failed.")
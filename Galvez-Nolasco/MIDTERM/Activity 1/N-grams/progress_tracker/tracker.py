@@ -1,7 +1,7 @@
 import json
 import os
 import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 
 
@@ -18,85 +18,301 @@ class TypingTestResult:
     test_duration: int  
 
 
+LOG_FORMAT_VERSION = "2.0"
+HEADER_SIZE = 1024
+HISTORY_LIMIT = 1000
+COMPACTION_SLACK = 100
+HEADER_TOTALS = ("total_tests", "best_wpm", "best_accuracy", "total_characters", "total_time",
+                 "records", "sum_wpm", "sum_accuracy")
+
+STORAGE_ENGINES = ("jsonl", "sqlite")
+DEFAULT_STORAGE = "jsonl"
+
+
 class ProgressTracker:    
-    def __init__(self, data_file: str = "typing_progress.json"):
+    def __init__(self, data_file: str = "typing_progress.json", storage: Optional[str] = None):
+        # data_file is the legacy JSON document; results now live in an
+        # append-only JSON Lines log (or a SQLite database) next to it. It is
+        # read once to seed a new log or database and never written again.
+        storage = (storage or DEFAULT_STORAGE).lower()
+        if storage not in STORAGE_ENGINES:
+            raise ValueError(f"Unknown storage engine '{storage}'. Use one of: {', '.join(STORAGE_ENGINES)}")
+        self.storage = storage
         self.data_file = data_file
-        self._ensure_data_file_exists()
+        self.log_file = f"{os.path.splitext(data_file)[0]}.jsonl"
+        self.db_file = f"{os.path.splitext(data_file)[0]}.sqlite3"
+        self._db = None
+        if storage == "sqlite":
+            from .sqlite_store import SqliteProgressStore
+            self._db = SqliteProgressStore(self.db_file)
+            if not self._db.is_initialized():
+                self._db.replace_all(self._existing_data())
+        else:
+            self._ensure_data_file_exists()
+    
+    def _existing_data(self) -> Dict:
+        # Seed a new database from whatever the file-based storage already holds
+        try:
+            if os.path.exists(self.log_file):
+                return self._data_from_log(*self._read_log()[:2])
+            if os.path.exists(self.data_file):
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pass
+        return self._fresh_data()
+    
+    def _fresh_data(self) -> Dict:
+        return {
+            "version": "1.0",
+            "created_date": datetime.datetime.now().strftime('%Y-%m-%d'),
+            "total_tests": 0,
+            "best_wpm": 0.0,
+            "best_accuracy": 0.0,
+            "average_wpm": 0.0,
+            "average_accuracy": 0.0,
+            "total_characters": 0,
+            "total_time": 0.0,
+            "test_history": []
+        }
     
     def _ensure_data_file_exists(self):
-        if not os.path.exists(self.data_file):
-            # Create initial data structure
-            initial_data = {
-                "version": "1.0",
-                "created_date": datetime.datetime.now().strftime('%Y-%m-%d'),
-                "total_tests": 0,
-                "best_wpm": 0.0,
-                "best_accuracy": 0.0,
-                "average_wpm": 0.0,
-                "average_accuracy": 0.0,
-                "total_characters": 0,
-                "total_time": 0.0,
-                "test_history": []
-            }
-            self._save_data(initial_data)
+        if os.path.exists(self.log_file):
+            return
+        if os.path.exists(self.data_file):
+            self._migrate_legacy_file()
+        else:
+            self._save_data(self._fresh_data())
     
-    def _load_data(self) -> Dict:
+    def _migrate_legacy_file(self):
         try:
             with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            # Create fresh data if corrupted
-            self._ensure_data_file_exists()
-            return self._load_data()
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            data = self._fresh_data()
+        self._save_data(data)
+    
+    def _header_from_data(self, data: Dict) -> Dict:
+        history = data.get("test_history", [])
+        created = data.get("created_date", datetime.datetime.now().strftime('%Y-%m-%d'))
+        return {
+            "version": LOG_FORMAT_VERSION,
+            "created_date": created,
+            "last_modified": data.get("last_modified", created),
+            "total_tests": data.get("total_tests", len(history)),
+            "best_wpm": data.get("best_wpm", 0.0),
+            "best_accuracy": data.get("best_accuracy", 0.0),
+            "total_characters": data.get("total_characters", 0),
+            "total_time": data.get("total_time", 0.0),
+            # running sums cover the records currently kept in the log
+            "records": len(history),
+            "sum_wpm": round(sum(test["wpm"] for test in history), 1),
+            "sum_accuracy": round(sum(test["accuracy"] for test in history), 1),
+        }
+    
+    def _encode_header(self, header: Dict) -> bytes:
+        encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(encoded) >= HEADER_SIZE:
+            raise ValueError("Progress log header is too large.")
+        # fixed width so the header can be rewritten in place
+        return encoded + b" " * (HEADER_SIZE - 1 - len(encoded)) + b"\n"
+    
+    def _decode_header(self, raw: bytes) -> Optional[Dict]:
+        try:
+            header = json.loads(raw)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+        if not isinstance(header, dict) or any(key not in header for key in HEADER_TOTALS):
+            return None
+        return header
+    
+    def _header_from_records(self, records: List[Dict]) -> Dict:
+        # All-time totals are lost with the header, so rebuild them from what is left
+        data = {
+            "total_tests": len(records),
+            "best_wpm": max((test["wpm"] for test in records), default=0.0),
+            "best_accuracy": max((test["accuracy"] for test in records), default=0.0),
+            "total_characters": sum(test.get("characters_typed", 0) for test in records),
+            "total_time": sum(test.get("time_taken", 0.0) for test in records),
+            "test_history": records,
+        }
+        dates = [test["date_taken"] for test in records if test.get("date_taken")]
+        if dates:
+            data["created_date"] = min(dates)
+        return self._header_from_data(data)
+    
+    def _count_record(self, header: Dict, record: Dict):
+        header["total_tests"] += 1
+        header["total_characters"] += record.get("characters_typed", 0)
+        header["total_time"] += record.get("time_taken", 0.0)
+        header["best_wpm"] = max(header["best_wpm"], record["wpm"])
+        header["best_accuracy"] = max(header["best_accuracy"], record["accuracy"])
+        header["records"] += 1
+        header["sum_wpm"] = round(header["sum_wpm"] + record["wpm"], 1)
+        header["sum_accuracy"] = round(header["sum_accuracy"] + record["accuracy"], 1)
+    
+    def _read_log(self) -> Tuple[Dict, List[Dict], bool]:
+        """Read the log, repairing the header in memory if it disagrees with the records.
+        
+        Lines that do not parse are skipped. Records past the header's "end"
+        offset were appended by a save that never got to update the header,
+        and are counted now. The returned flag is True when anything had to
+        be repaired, so the caller can write the log back.
+        """
+        with open(self.log_file, 'rb') as f:
+            raw = f.read()
+        header = self._decode_header(raw[:HEADER_SIZE])
+        body_start = HEADER_SIZE if header is not None else 0
+        end = header.get("end") if header is not None else None
+        
+        records, pending = [], []
+        skipped = False
+        offset = body_start
+        for line in raw[body_start:].splitlines(keepends=True):
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                record = None
+            if not isinstance(record, dict) or "wpm" not in record or "accuracy" not in record:
+                # a torn line from an interrupted write, or a damaged header
+                skipped = True
+                continue
+            (pending if end is not None and offset > end else records).append(record)
+        
+        if header is None:
+            records += pending
+            return self._header_from_records(records), records, True
+        
+        if end is None and len(records) > header["records"]:
+            # logs written before the header tracked its end offset
+            records, pending = records[:header["records"]], records[header["records"]:]
+        repaired = skipped or bool(pending) or end != offset or header["records"] != len(records)
+        if header["records"] != len(records):
+            header["records"] = len(records)
+            header["sum_wpm"] = round(sum(test["wpm"] for test in records), 1)
+            header["sum_accuracy"] = round(sum(test["accuracy"] for test in records), 1)
+        for record in pending:
+            self._count_record(header, record)
+        return header, records + pending, repaired
+    
+    def _load_log(self) -> Tuple[Dict, List[Dict]]:
+        header, records, repaired = self._read_log()
+        if repaired:
+            self._write_log(header, records)
+        return header, records
+    
+    def _write_log(self, header: Dict, records: List[Dict]):
+        body = b"".join((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8') for record in records)
+        header = dict(header, end=HEADER_SIZE + len(body))
+        temp_file = f"{self.log_file}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(self._encode_header(header))
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.log_file)
+    
+    def _data_from_log(self, header: Dict, records: List[Dict]) -> Dict:
+        count = header.get("records", len(records))
+        return {
+            "version": header.get("version", LOG_FORMAT_VERSION),
+            "created_date": header.get("created_date"),
+            "total_tests": header.get("total_tests", 0),
+            "best_wpm": header.get("best_wpm", 0.0),
+            "best_accuracy": header.get("best_accuracy", 0.0),
+            "average_wpm": round(header.get("sum_wpm", 0.0) / count, 1) if count else 0.0,
+            "average_accuracy": round(header.get("sum_accuracy", 0.0) / count, 1) if count else 0.0,
+            "total_characters": header.get("total_characters", 0),
+            "total_time": header.get("total_time", 0.0),
+            "test_history": records,
+            "last_modified": header.get("last_modified"),
+        }
+    
+    def _load_data(self) -> Dict:
+        if self._db is not None:
+            return self._db.load_data()
+        # the legacy file is only migrated when no log exists; a damaged log
+        # is repaired from the records it still holds
+        self._ensure_data_file_exists()
+        return self._data_from_log(*self._load_log())
     
     def _save_data(self, data: Dict):
         try:
-            temp_file = f"{self.data_file}.tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            os.replace(temp_file, self.data_file)
-            
+            if self._db is not None:
+                self._db.replace_all(data)
+                return
+            self._write_log(self._header_from_data(data), data.get("test_history", []))
         except Exception as e:
             print(f"Error saving progress data: {e}")
     
     def save_test_result(self, result: TypingTestResult):
-        data = self._load_data()
-        
         # Round values to 1 decimal place
         result.wpm = round(result.wpm, 1)
         result.accuracy = round(result.accuracy, 1)
         
-        # Add new result to history
-        data["test_history"].append(asdict(result))
+        if self._db is not None:
+            try:
+                self._db.add_result(asdict(result))
+            except Exception as e:
+                print(f"Error saving progress data: {e}")
+            return
         
-        # Update statistics
-        data["total_tests"] += 1
-        data["total_characters"] += result.characters_typed
-        data["total_time"] += result.time_taken
-        
-        # Update best scores
-        if result.wpm > data["best_wpm"]:
-            data["best_wpm"] = result.wpm
-        
-        if result.accuracy > data["best_accuracy"]:
-            data["best_accuracy"] = result.accuracy
-        
-        # Calculate averages and round to 1 decimal place
-        all_wpms = [test["wpm"] for test in data["test_history"]]
-        all_accuracies = [test["accuracy"] for test in data["test_history"]]
-        
-        data["average_wpm"] = round(sum(all_wpms) / len(all_wpms), 1)
-        data["average_accuracy"] = round(sum(all_accuracies) / len(all_accuracies), 1)
-        
-        if len(data["test_history"]) > 1000:
-            data["test_history"] = data["test_history"][-1000:]
-        
-        data["last_modified"] = datetime.datetime.now().strftime('%Y-%m-%d')
+        try:
+            self._ensure_data_file_exists()
+            with open(self.log_file, 'rb') as f:
+                header = self._decode_header(f.read(HEADER_SIZE))
+            if header is None or header.get("end") != os.path.getsize(self.log_file):
+                # an earlier save was interrupted; fold its record in first
+                self._load_log()
+            
+            line = (json.dumps(asdict(result), ensure_ascii=False) + "\n").encode('utf-8')
+            with open(self.log_file, 'r+b') as f:
+                header = self._decode_header(f.read(HEADER_SIZE))
+                
+                # Append the record, then update the running aggregates in place.
+                # Until the header is rewritten the record lies past "end", and
+                # _read_log() counts it on the next read.
+                f.seek(0, os.SEEK_END)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                
+                self._count_record(header, asdict(result))
+                header["end"] += len(line)
+                header["last_modified"] = datetime.datetime.now().strftime('%Y-%m-%d')
+                
+                f.seek(0)
+                f.write(self._encode_header(header))
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error saving progress data: {e}")
+            return
         
-        self._save_data(data)
+        if header["records"] > HISTORY_LIMIT + COMPACTION_SLACK:
+            self.compact()
+    
+    def compact(self):
+        if self._db is not None:
+            # the database trims its history on every insert
+            return
+        try:
+            header, records = self._read_log()[:2]
+            records = records[-HISTORY_LIMIT:]
+            header["records"] = len(records)
+            header["sum_wpm"] = round(sum(test["wpm"] for test in records), 1)
+            header["sum_accuracy"] = round(sum(test["accuracy"] for test in records), 1)
+            self._write_log(header, records)
+        except Exception as e:
+            print(f"Error compacting progress data: {e}")
     
     def get_progress_summary(self) -> Dict:
+        if self._db is not None:
+            return self._db.progress_summary()
+        
         data = self._load_data()
         
         recent_tests = data["test_history"][-10:] if data["test_history"] else []
@@ -119,6 +335,9 @@ class ProgressTracker:
         return summary
     
     def get_difficulty_stats(self) -> Dict:
+        if self._db is not None:
+            return self._db.difficulty_stats()
+        
         data = self._load_data()
         
         difficulty_stats = {"easy": [], "medium": [], "hard": []}
@@ -169,6 +388,9 @@ class ProgressTracker:
             return False
     
     def get_progress_chart_data(self) -> Dict:
+        if self._db is not None:
+            return self._db.chart_data(30)
+        
         data = self._load_data()
         
         recent_tests = data["test_history"][-30:] if data["test_history"] else []
@@ -186,30 +408,19 @@ class ProgressTracker:
         confirm = input("Are you sure you want to reset ALL progress data? (type 'YES' to confirm): ")
         if confirm == "YES":
             # Create fresh empty data structure
-            fresh_data = {
-                "version": "1.0",
-                "created_date": datetime.datetime.now().strftime('%Y-%m-%d'),
-                "total_tests": 0,
-                "best_wpm": 0.0,
-                "best_accuracy": 0.0,
-                "average_wpm": 0.0,
-                "average_accuracy": 0.0,
-                "total_characters": 0,
-                "total_time": 0.0,
-                "test_history": []
-            }
-            self._save_data(fresh_data)
+            self._save_data(self._fresh_data())
             print("Progress data has been reset.")
         else:
             print("Progress reset cancelled.")
     
     def get_file_info(self) -> Dict:
+        path = self.db_file if self._db is not None else self.log_file
         try:
-            stat = os.stat(self.data_file)
+            stat = os.stat(path)
             return {
                 "file_size": stat.st_size,
                 "last_modified": datetime.datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d'),
-                "file_path": os.path.abspath(self.data_file)
+                "file_path": os.path.abspath(path)
             }
         except Exception as e:
             return {"error": str(e)}
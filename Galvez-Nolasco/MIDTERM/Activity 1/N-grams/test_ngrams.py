@@ -0,0 +1,345 @@
+import os
+import pickle
+import random
+import re
+import tempfile
+import threading
+from collections import Counter
+
+from ngrams import Ngrams, CompiledModel, CorpusContainer, NgramTable, NgramSampler, SAMPLING_JITTER, _expected_tempered
+
+WORDS = ["alpha", "beta", "gamma", "delta", "echo", "fox", "golf", "hotel"]
+PUNCTUATION = [".", "!", "?", ",", ";", "'"]
+
+
+def _random_text(rng: random.Random, words, sentences: int) -> str:
+    parts = []
+    for _ in range(sentences):
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 7)))
+        if rng.random() < 0.3:
+            sentence += rng.choice(PUNCTUATION[3:]) + " " + rng.choice(words)
+        parts.append(sentence + (rng.choice(PUNCTUATION[:3]) if rng.random() < 0.8 else ""))
+    return " ".join(parts)
+
+
+def _decoded(model: CompiledModel) -> dict:
+    """The model with token ids replaced by tokens, so differently numbered models compare equal."""
+    # the shuffled variants are random, so only the main tables are compared
+    ngrams = {}
+    for order, table in model.models_by_order.items():
+        mask = (1 << table.bits) - 1
+        for key, count in table.to_counts().items():
+            ids = []
+            for _ in range(order):
+                ids.append(key & mask)
+                key >>= table.bits
+            ngrams[tuple(model.id_to_token[i] for i in reversed(ids))] = count
+    return {
+        "ngrams": ngrams,
+        "token_counts": {tok: c for tok, c in model.token_counts.items() if c},
+        "unigram_counts": {tok: c for tok, c in model.unigram_counts.items() if c},
+        "word_difficulty": model.word_difficulty,
+        "tail": model.tail,
+        "ends_sentence": model.ends_sentence,
+    }
+
+
+def _rows_match_folded(model: CompiledModel) -> bool:
+    # the sampler reads rows through the overlay, exports go through folded()
+    for table in model.models_by_order.values():
+        folded = table.folded()
+        for ctx in set(table.overlay) | set(folded.contexts):
+            row, expected = table.row(ctx), folded.row(ctx)
+            if (row and (list(row[0]), list(row[1]), row[2])) != (expected and (list(expected[0]), list(expected[1]), expected[2])):
+                return False
+    return True
+
+
+def _compile(directory: str, text: str) -> CompiledModel:
+    path = os.path.join(directory, "corpus.pkl")
+    with open(path, "wb") as f:
+        pickle.dump({"easy": text, "medium": "", "hard": ""}, f)
+    return Ngrams(corpus_file=[path], difficulty="easy").compile_model("easy")
+
+
+def test_parallel_build_matches_serial():
+    try:
+        rng = random.Random(20)
+        words = WORDS + ["india", "juliet", "kilo", "lima"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.pkl")
+            sections = {section: _random_text(rng, words, 60) for section in ("easy", "medium", "hard")}
+            # a section that stops mid-sentence, and one long run-on sentence
+            sections["medium"] = sections["medium"].rstrip(".!?") + " and then"
+            sections["hard"] = " ".join(rng.choice(words) for _ in range(300))
+            with open(path, "wb") as f:
+                pickle.dump(sections, f)
+            builder = Ngrams(corpus_file=[path], difficulty="easy")
+            serial = {section: builder.compile_model(section) for section in sections}
+            # small shards so the boundaries cut through words and sentences
+            for shard_chars in (37, 200):
+                parallel = builder.compile_models(tuple(sections), workers=2, shard_chars=shard_chars)
+                for section, model in parallel.items():
+                    assert model.id_to_token == serial[section].id_to_token, f"{section} vocabulary"
+                    assert _decoded(model) == _decoded(serial[section]), f"{section} at {shard_chars} chars"
+        print("✅ Parallel build matches the serial build")
+        return True
+    except Exception as e:
+        print(f"❌ Parallel build test failed: {e!r}")
+        return False
+
+
+def test_concurrent_saves(writers: int = 8, rounds: int = 20):
+    try:
+        rng = random.Random(16)
+        with tempfile.TemporaryDirectory() as tmp:
+            model = _compile(tmp, _random_text(rng, WORDS, 20))
+            builder = Ngrams(corpus_file=[os.path.join(tmp, "corpus.pkl")], difficulty="easy")
+            container = os.path.join(tmp, "corpus.ngc")
+            artifact = os.path.join(tmp, "easy.pkl")
+            texts = [_random_text(rng, WORDS, 200) for _ in range(writers)]
+            failures = []
+
+            def save(i):
+                for _ in range(rounds):
+                    try:
+                        CorpusContainer.write(container, {"*": texts[i]})
+                    except OSError as e:
+                        failures.append(e)
+                    if not builder.save_compiled_model(model, artifact):
+                        failures.append(i)
+
+            threads = [threading.Thread(target=save, args=(i,)) for i in range(writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not failures, f"{len(failures)} failed saves"
+            # the last writer wins whole; no write is torn or left behind
+            with CorpusContainer(container) as corpus:
+                assert corpus.section_text(None) in texts
+            with open(artifact, "rb") as f:
+                assert _decoded(CompiledModel.from_dict(pickle.load(f))) == _decoded(model)
+            assert sorted(os.listdir(tmp)) == ["corpus.ngc", "corpus.pkl", "easy.pkl"], os.listdir(tmp)
+        print("✅ Concurrent saves never clobber each other")
+        return True
+    except Exception as e:
+        print(f"❌ Concurrent save test failed: {e!r}")
+        return False
+
+
+def _reference_tokenize(text: str, special_tokens: bool = True) -> list:
+    # the whole-text tokenizer the chunked one replaced
+    if not text or not text.strip():
+        return []
+    tokens = []
+    for sent in re.split(r'(?<=[.!?])\s+', text.strip()):
+        if not sent:
+            continue
+        if special_tokens:
+            tokens.append("<START>")
+        tokens.extend(re.findall(r"\w+|[^\w\s]", sent))
+        if special_tokens:
+            tokens.append("<END>")
+    return tokens
+
+
+def _random_chunks(rng: random.Random, text: str) -> list:
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 8))))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_chunked_tokenize_matches_whole_text(trials: int = 2000):
+    try:
+        tokenizer = Ngrams(corpus_file=[], difficulty="easy")
+        pieces = ["alpha", "beta", "café", "x", "42", ".", "!", "?", ",", "'", "...", " ", "  ", "\n", "\n\n", "\t", " \n "]
+        rng = random.Random(18)
+        texts = ["", "   ", "One. Two! Three? ", "  Lead and trail  ", "Ends mid sentence", "Dots... then  more.\n\nNext"]
+        texts += ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 30))) for _ in range(trials)]
+        for text in texts:
+            for special in (True, False):
+                expected = _reference_tokenize(text, special)
+                assert tokenizer._tokenize(text, special) == expected, repr(text)
+                # every two-chunk split, so boundaries fall inside words, punctuation and whitespace runs
+                for cut in range(len(text) + 1):
+                    chunks = [text[:cut], text[cut:]]
+                    assert list(tokenizer._iter_tokens_from_chunks(chunks, special)) == expected, (repr(text), cut)
+                chunks = _random_chunks(rng, text)
+                assert list(tokenizer._iter_tokens_from_chunks(chunks, special)) == expected, (repr(text), chunks)
+        print(f"✅ Chunked tokenizing matches whole-text tokenizing ({len(texts)} texts)")
+        return True
+    except Exception as e:
+        print(f"❌ Chunked tokenize test failed: {e!r}")
+        return False
+
+
+def test_incremental_update_matches_rebuild(trials: int = 40):
+    min_rows = NgramTable.OVERLAY_MIN_ROWS
+    try:
+        rng = random.Random(19)
+        with tempfile.TemporaryDirectory() as tmp:
+            for trial in range(trials):
+                # a zero limit folds the overlay back into the arrays on every update
+                NgramTable.OVERLAY_MIN_ROWS = rng.choice((0, min_rows))
+                words = WORDS[:rng.randint(2, len(WORDS))]
+                text = _random_text(rng, words, rng.randint(1, 6))
+                model = _compile(tmp, text)
+                updater = Ngrams(corpus_file=[os.path.join(tmp, "corpus.pkl")], difficulty="easy")
+                for _ in range(rng.randint(1, 4)):
+                    # new words push some trials past the current id width
+                    extra = words + ["".join(rng.choice("xyz") for _ in range(3)) for _ in range(rng.randint(0, 5))]
+                    appended = "\n\n" + _random_text(rng, extra, rng.randint(1, 4))
+                    model = updater.extend_compiled_model(model, appended)
+                    assert _rows_match_folded(model), f"trial {trial}: overlay rows differ from the folded table"
+                    text += appended
+                    expected = _compile(tmp, text)
+                    assert _decoded(model) == _decoded(expected), f"trial {trial} differs from a rebuild"
+        print(f"✅ Incremental updates match a full rebuild ({trials} trials)")
+        return True
+    except Exception as e:
+        print(f"❌ Incremental update test failed: {e!r}")
+        return False
+    finally:
+        NgramTable.OVERLAY_MIN_ROWS = min_rows
+
+
+def _sampler_distribution(sampler: NgramSampler, ctx) -> list:
+    """Exact next-token distribution of NgramSampler.sample over its pool."""
+    size = len(sampler.pool)
+    probs = [0.1 / size] * size
+    boosted = sampler._context_mass(ctx)
+    for exponent, level_weights in zip(sampler._exponents, sampler._weights):
+        weights = list(level_weights)
+        for idx, extra in boosted:
+            weights[idx] = _expected_tempered(sampler._base[idx] + extra, exponent)
+        total = sum(weights)
+        for i, w in enumerate(weights):
+            probs[i] += 0.9 / len(sampler._exponents) * w / total
+    return probs
+
+
+def _scores(sampler: NgramSampler, ctx) -> list:
+    # interpolated probability of every pool token, as the old sampler scored it
+    scores = list(sampler._base)
+    ctx_ids = [sampler.token_ids.get(tok, -1) for tok in ctx]
+    for order in range(2, sampler.n + 1):
+        weight = sampler.lambdas.get(order, 0.0)
+        table = sampler.models_by_order.get(order)
+        order_ids = ctx_ids[-(order - 1):]
+        if weight <= 0 or table is None or -1 in order_ids:
+            continue
+        row = table.row(table.pack(order_ids))
+        if row is not None:
+            for token_id, count in zip(row[0], row[1]):
+                idx = sampler.pool_slot[token_id]
+                if idx >= 0:
+                    scores[idx] += weight * count / (row[2] or 1)
+    return scores
+
+
+def _old_distribution(scores: list, steps: int = 16) -> list:
+    """Expected next-token distribution of the per-call roulette NgramSampler replaced.
+
+    That sampler drew a temperature T from U(1.2, 1.5), added U(0, jitter) to
+    each score p and picked tokens in proportion to (p + u) ** (1 / T). The
+    expectation of s_i / sum(s) is integrated over T with Simpson's rule and
+    over the jitter with a third-order expansion in s_i / sum(s), which is
+    below 1e-8 relative error at these pool sizes.
+    """
+    def moment(p: float, a: float) -> float:
+        # E[(p + U(0, jitter)) ** a]
+        return ((p + SAMPLING_JITTER) ** (a + 1) - p ** (a + 1)) / (SAMPLING_JITTER * (a + 1))
+
+    size = len(scores)
+    probs = [0.1 / size] * size
+    for step in range(steps + 1):
+        k = 1.0 / (1.2 + 0.3 * step / steps)
+        weight = (1 if step in (0, steps) else 4 if step % 2 else 2) / (3 * steps)
+        m1 = [moment(p, k) for p in scores]
+        m2 = [moment(p, 2 * k) for p in scores]
+        m3 = [moment(p, 3 * k) for p in scores]
+        mean = sum(m1)
+        var = sum(b - a * a for a, b in zip(m1, m2))
+        for i in range(size):
+            rest = mean - m1[i]
+            rest_var = var - (m2[i] - m1[i] ** 2)
+            expected = (m1[i] / rest - m2[i] / rest ** 2 + m3[i] / rest ** 3
+                        + rest_var * (m1[i] / rest ** 3 - 3 * m2[i] / rest ** 4))
+            probs[i] += 0.9 * weight * expected
+    return probs
+
+
+def _total_variation(p: list, q: list) -> float:
+    return 0.5 * sum(abs(a - b) for a, b in zip(p, q))
+
+
+def test_sampler_matches_old_distribution(max_distance: float = 1e-3):
+    try:
+        rng = random.Random(2)
+        
+        # On a small pool, check both reference distributions against draws
+        unigrams = Counter(dict(zip(WORDS, [50, 5, 20, 1, 9, 30, 2, 7])))
+        sampler = NgramSampler(list(unigrams), {}, unigrams, 3, {1: 0.4, 2: 0.3, 3: 0.3}, lambda length: True)
+        sampler._context_cache[("x",)] = [(0, 0.3), (3, 0.2), (7, 0.1)]
+        draws = 200000
+        random.seed(2)
+        counts = Counter(sampler.sample(("x",)) for _ in range(draws))
+        empirical = [counts[tok] / draws for tok in sampler.pool]
+        assert _total_variation(empirical, _sampler_distribution(sampler, ("x",))) < 0.005, "sampler draws"
+        
+        # the old sampler, scoring the whole pool on every draw; the reference
+        # expansion needs a pool of realistic size
+        scores = [rng.random() * 0.001 for _ in range(200)]
+        for i, extra in ((0, 0.5), (7, 0.3), (42, 0.1)):
+            scores[i] += extra
+        old = [0.1 / len(scores)] * len(scores)
+        trials = 10000
+        for _ in range(trials):
+            k = 1.0 / rng.uniform(1.2, 1.5)
+            s = [(p + rng.uniform(0, SAMPLING_JITTER)) ** k for p in scores]
+            total = sum(s)
+            for i, value in enumerate(s):
+                old[i] += 0.9 / trials * value / total
+        assert _total_variation(old, _old_distribution(scores)) < 0.005, "old sampler reference"
+        print("✅ Sampler distributions agree with draws")
+        
+        # On the real corpus, bound how far the prefix-sum sampler drifts
+        worst = 0.0
+        for difficulty in ("easy", "medium", "hard"):
+            ngrams = Ngrams(corpus_file=["corpora/corpora.pkl"], n=3, difficulty=difficulty)
+            model = ngrams.get_shared_model()
+            sampler = NgramSampler(model.id_to_token, model.models_by_order, model.unigram_counts, 3,
+                                   ngrams._get_interpolation_weights(3), ngrams._in_length_range)
+            table = model.models_by_order[3]
+            mask = (1 << table.bits) - 1
+            contexts = [("<START>", "<START>")] + [
+                (model.id_to_token[key >> table.bits], model.id_to_token[key & mask])
+                for key in rng.sample(list(table.contexts), 2)
+            ]
+            for ctx in contexts:
+                distance = _total_variation(_sampler_distribution(sampler, ctx), _old_distribution(_scores(sampler, ctx)))
+                worst = max(worst, distance)
+                assert distance < max_distance, f"{difficulty} {ctx}: total variation {distance:.2e}"
+        print(f"✅ Sampler within {worst:.1e} total variation of the old sampler")
+        return True
+    except Exception as e:
+        print(f"❌ Sampler distribution test failed: {e!r}")
+        return False
+
+
+if __name__ == "__main__":
+    print("🧪 Testing N-gram model building")
+    print("=" * 40)
+
+    results = [
+        test_chunked_tokenize_matches_whole_text(),
+        test_incremental_update_matches_rebuild(),
+        test_parallel_build_matches_serial(),
+        test_concurrent_saves(),
+        test_sampler_matches_old_distribution(),
+    ]
+
+    if all(results):
+        print("\n🎉 All tests passed!")
+    else:
+        print("\n⚠️  Some tests failed.")
@@ -1,3 +1,5 @@
+import argparse
+
 try:
     from . import TypingGame
 except Exception:
@@ -5,11 +7,13 @@ except Exception:
 
 
 def main() -> None:
-    game = TypingGame()
+    parser = argparse.ArgumentParser(description="Grammytype typing game")
+    parser.add_argument("--profile", action="store_true", help="show the frame-time HUD (F3 toggles, F4 writes the trace)")
+    parser.add_argument("--trace", default=None, help="frame trace file written on exit when profiling")
+    args = parser.parse_args()
+    game = TypingGame(profile=args.profile or None, trace_file=args.trace)
     game.run()
 
 
 if __name__ == "__main__":
     main()
-
-
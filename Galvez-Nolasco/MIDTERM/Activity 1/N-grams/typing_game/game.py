@@ -1,6 +1,8 @@
+import os
 import time
+import bisect
 import random
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Optional
 
 import pygame
 
@@ -31,13 +33,26 @@ from .constants import (
     GAME,
     RESULTS,
 )
-from .particles import Particle
+from .particles import ParticleSystem
+from .prefetch import PhrasePrefetcher
+from .profiler import FrameProfiler
+from .typing_buffer import TypingBuffer
 from .ui import ModernButton, OutlineButton
 from ngrams import Ngrams
 
 
+PROFILED_PHASES = (
+    "update_particles",
+    "draw_modern_background",
+    "draw_particles",
+    "draw_target_text",
+    "handle_typing",
+    "refill_target_text",
+)
+
+
 class TypingGame:
-    def __init__(self):
+    def __init__(self, profile: Optional[bool] = None, trace_file: Optional[str] = None):
         if not pygame.get_init():
             pygame.init()
         try:
@@ -62,14 +77,13 @@ class TypingGame:
         except Exception:
             self.menu_background = None
         self.state = MENU
-        self.particles: List[Particle] = []
-        self.background_particles: List[Particle] = []
-        self.typing_text = ""
+        self.particles = ParticleSystem()
+        self.background_particles = ParticleSystem()
+        self.typing = TypingBuffer()
         self.target_text = ""
         self.start_time = 0.0
         self.is_typing = False
         self.current_char_index = 0
-        self.correct_chars = 0
         self.total_chars = 0
         self.wpm = 0.0
         self.accuracy = 0.0
@@ -82,13 +96,39 @@ class TypingGame:
         self.base_target_len = 8
         self.avg_word_len = 6.0
         self.ngrams_obj = None
+        self.phrase_prefetcher = PhrasePrefetcher(corpus_file="corpora/corpora.pkl")
         self.render_start_index = 0
+        self._glyph_cache: Dict[Tuple[str, tuple], pygame.Surface] = {}
+        self._glyph_widths: Dict[str, int] = {}
+        self._background_cache: Optional[pygame.Surface] = None
+        self._accent_surfaces: List[pygame.Surface] = []
+        for i in range(3):
+            accent_surf = pygame.Surface((200, 2), pygame.SRCALPHA)
+            accent_surf.fill((*PRIMARY_BLUE, 30 - i * 8))
+            self._accent_surfaces.append(accent_surf)
+        self._reset_text_layout()
         self.setup_ui()
         self.generate_background_particles()
         self.menu_animation_time = 0
         self.title_glow = 0
         self.background_shift = 0
 
+        # TYPING_PROFILE=1 turns on the frame-time HUD (F3 toggles it, F4 writes the trace)
+        if profile is None:
+            profile = os.environ.get("TYPING_PROFILE", "") not in ("", "0")
+        if trace_file is None:
+            trace_file = os.environ.get("TYPING_PROFILE_TRACE", "frame_trace.json")
+        self.profiler = FrameProfiler(enabled=profile, trace_file=trace_file)
+        self.profiler.instrument(self, PROFILED_PHASES)
+
+    @property
+    def typing_text(self) -> str:
+        return self.typing.text
+
+    @property
+    def correct_chars(self) -> int:
+        return self.typing.correct
+
     def setup_ui(self):
         row_button_width, row_button_height = 260, 54
         gap = 40
@@ -131,54 +171,48 @@ class TypingGame:
             color = random.choice(colors)
             vx = random.uniform(-0.2, 0.2)
             vy = random.uniform(-0.2, 0.2)
-            particle = Particle(x, y, color, (vx, vy))
-            particle.life = random.uniform(0.3, 0.7)
-            self.background_particles.append(particle)
+            self.background_particles.emit(x, y, color, (vx, vy), life=random.uniform(0.3, 0.7))
 
     def create_particles(self, x: int, y: int, color: Tuple[int, int, int], count: int = 12):
         for _ in range(count):
             vx = random.uniform(-3, 3)
             vy = random.uniform(-5, -2)
-            particle = Particle(x, y, color, (vx, vy))
-            self.particles.append(particle)
+            self.particles.emit(x, y, color, (vx, vy))
 
     def update_particles(self):
-        for particle in self.background_particles:
-            particle.update()
-            if particle.life <= 0:
-                particle.x = random.randint(0, self.current_width)
-                particle.y = random.randint(0, self.current_height)
-                particle.life = random.uniform(0.3, 0.7)
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
+        self.background_particles.update(respawn_area=(self.current_width, self.current_height))
+        self.particles.update()
 
     def draw_particles(self):
-        for particle in self.background_particles:
-            particle.draw(self.screen)
-        for particle in self.particles:
-            particle.draw(self.screen)
+        self.background_particles.draw(self.screen)
+        self.particles.draw(self.screen)
+
+    def _render_background(self, width: int, height: int) -> pygame.Surface:
+        surface = pygame.Surface((width, height))
+        surface.fill(BG_DARKEST)
+        for y in range(0, height, 2):
+            ratio = y / height
+            r = int(GRADIENT_START[0] * (1 - ratio) + GRADIENT_END[0] * ratio)
+            g = int(GRADIENT_START[1] * (1 - ratio) + GRADIENT_END[1] * ratio)
+            b = int(GRADIENT_START[2] * (1 - ratio) + GRADIENT_END[2] * ratio)
+            r = max(8, min(25, r))
+            g = max(12, min(35, g))
+            b = max(18, min(45, b))
+            pygame.draw.line(surface, (r, g, b), (0, y), (width, y))
+        if pygame.display.get_surface() is not None:
+            # match the display format so the per-frame blit is a plain copy
+            surface = surface.convert()
+        return surface
 
     def draw_modern_background(self):
         self.menu_animation_time += 0.008
         self.background_shift += 0.002
-        self.screen.fill(BG_DARKEST)
-        for y in range(0, self.current_height, 2):
-            ratio = y / self.current_height
-            time_offset = random.random() * 0.0 + 0.0
-            r = int(GRADIENT_START[0] * (1 - ratio + time_offset) + GRADIENT_END[0] * (ratio - time_offset))
-            g = int(GRADIENT_START[1] * (1 - ratio + time_offset) + GRADIENT_END[1] * (ratio - time_offset))
-            b = int(GRADIENT_START[2] * (1 - ratio + time_offset) + GRADIENT_END[2] * (ratio - time_offset))
-            r = max(8, min(25, r))
-            g = max(12, min(35, g))
-            b = max(18, min(45, b))
-            color = (r, g, b)
-            pygame.draw.line(self.screen, color, (0, y), (self.current_width, y))
-        for i in range(3):
+        size = (self.current_width, self.current_height)
+        if self._background_cache is None or self._background_cache.get_size() != size:
+            self._background_cache = self._render_background(*size)
+        self.screen.blit(self._background_cache, (0, 0))
+        for i, accent_surf in enumerate(self._accent_surfaces):
             offset = (self.background_shift + i * 0.3) % self.current_width
-            alpha = 30 - i * 8
-            accent_surf = pygame.Surface((200, 2), pygame.SRCALPHA)
-            pygame.draw.rect(accent_surf, (*PRIMARY_BLUE, alpha), accent_surf.get_rect())
             self.screen.blit(accent_surf, (offset, 100 + i * 200))
 
     def draw_menu(self):
@@ -236,7 +270,7 @@ class TypingGame:
             (f" {self.time_remaining:.1f}s" if self.is_typing else " Start typing", SECONDARY_BLUE, start_x + panel_width + panel_spacing, panel_y),
         ]
         if self.is_typing:
-            typed_chars = len(self.typing_text)
+            typed_chars = len(self.typing)
             if typed_chars > 0:
                 accuracy = (self.correct_chars / typed_chars) * 100
                 info_panels.append((f" {accuracy:.1f}%", SUCCESS_GREEN, start_x + (panel_width + panel_spacing) * 2, panel_y))
@@ -283,6 +317,71 @@ class TypingGame:
             progress_surface = self.font_tiny.render(progress_text, True, WHITE)
             self.screen.blit(progress_surface, (60, 740))
 
+    def _reset_text_layout(self, width: int = 0):
+        self._layout_text = ""
+        self._layout_width = width
+        self._layout_x = 0
+        self._line_starts: List[int] = [0]
+        self._glyph_x: List[int] = []
+        self._line_cache: Dict[int, Tuple[tuple, pygame.Surface]] = {}
+
+    def _glyph(self, ch: str, color: tuple) -> pygame.Surface:
+        key = (ch, color)
+        surface = self._glyph_cache.get(key)
+        if surface is None:
+            surface = self.font_medium.render(ch, True, color)
+            self._glyph_cache[key] = surface
+        return surface
+
+    def _glyph_width(self, ch: str) -> int:
+        width = self._glyph_widths.get(ch)
+        if width is None:
+            width = self._glyph(ch, WHITE).get_width()
+            self._glyph_widths[ch] = width
+        return width
+
+    def _extend_text_layout(self, width: int):
+        text = self.target_text
+        if text is self._layout_text and width == self._layout_width:
+            return
+        if width != self._layout_width or not text.startswith(self._layout_text):
+            self._reset_text_layout(width)
+        elif self._line_cache:
+            # the last line may grow when phrases are appended
+            self._line_cache.pop(len(self._line_starts) - 1, None)
+        x = self._layout_x
+        for idx in range(len(self._glyph_x), len(text)):
+            w = self._glyph_width(text[idx])
+            if x > 0 and x + w > width:
+                x = 0
+                self._line_starts.append(idx)
+            self._glyph_x.append(x)
+            x += w
+        self._layout_x = x
+        self._layout_text = text
+
+    def _render_text_line(self, line: int, height: int) -> pygame.Surface:
+        start = self._line_starts[line]
+        end = self._line_starts[line + 1] if line + 1 < len(self._line_starts) else len(self._glyph_x)
+        typed = self.typing.flags[start:end]
+        key = (end, bytes(typed))
+        cached = self._line_cache.get(line)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        surface = pygame.Surface((self._layout_width + 2, height + 2), pygame.SRCALPHA)
+        for idx in range(start, end):
+            ch = self.target_text[idx]
+            offset = idx - start
+            if offset < len(typed):
+                color = SUCCESS_GREEN if typed[offset] else ERROR_RED
+            else:
+                color = (100, 100, 100)
+            x = self._glyph_x[idx]
+            surface.blit(self._glyph(ch, (*BLACK, 80)), (x + 1, 1))
+            surface.blit(self._glyph(ch, color), (x, 0))
+        self._line_cache[line] = (key, surface)
+        return surface
+
     def draw_target_text(self, area: pygame.Rect):
         margin_x = 40
         margin_y = 40
@@ -291,81 +390,35 @@ class TypingGame:
         max_x = area.x + area.width - margin_x
         max_y = area.y + area.height - margin_y
         line_step = 70
-        caret_index = min(len(self.typing_text), len(self.target_text))
-        if self.render_start_index > caret_index:
-            self.render_start_index = max(0, caret_index - 50)
-
-        def simulate(start_idx: int):
-            x = x0
-            y = y0
-            line_starts = [start_idx]
-            caret_pos = None
-            for abs_idx in range(start_idx, len(self.target_text)):
-                ch = self.target_text[abs_idx]
-                char_surface = self.font_medium.render(ch, True, WHITE)
-                w = char_surface.get_width()
-                if x + w > max_x:
-                    x = x0
-                    y += line_step
-                    line_starts.append(abs_idx)
-                    if y + self.font_medium.get_height() > max_y:
-                        break
-                if abs_idx == caret_index:
-                    caret_pos = (x, y)
-                x += w
-                if y + self.font_medium.get_height() > max_y:
-                    break
-            return line_starts, caret_pos
-
-        line_starts, caret_pos = simulate(self.render_start_index)
-        if caret_pos is None or (caret_pos[1] + self.font_medium.get_height() > max_y):
-            probe_start = max(0, caret_index - 200)
-            self.render_start_index = probe_start
-            for _ in range(12):
-                ls, cp = simulate(self.render_start_index)
-                if cp is None:
-                    break
-                if cp[1] + self.font_medium.get_height() <= max_y:
-                    break
-                if len(ls) >= 2:
-                    self.render_start_index = ls[1]
-                else:
-                    self.render_start_index += 5
-            line_starts, caret_pos = simulate(self.render_start_index)
-
-        x = x0
-        y = y0
-        cursor_drawn = False
-        for abs_idx in range(self.render_start_index, len(self.target_text)):
-            ch = self.target_text[abs_idx]
-            if abs_idx < len(self.typing_text):
-                color = SUCCESS_GREEN if self.typing_text[abs_idx] == ch else ERROR_RED
-            else:
-                color = (100, 100, 100)
-            char_surface = self.font_medium.render(ch, True, color)
-            shadow_surface = self.font_medium.render(ch, True, (*BLACK, 80))
-            w = char_surface.get_width()
-            if x + w > max_x:
-                x = x0
-                y += line_step
-                if y + self.font_medium.get_height() > max_y:
-                    break
-            self.screen.blit(shadow_surface, (x + 1, y + 1))
-            self.screen.blit(char_surface, (x, y))
-            if not cursor_drawn and abs_idx == caret_index and self.is_typing:
-                cursor_time = time.time() * 2
-                if int(cursor_time) % 2 == 0:
-                    cursor_height = self.font_medium.get_height()
-                    pygame.draw.line(self.screen, PRIMARY_BLUE, (x, y), (x, y + cursor_height), 3)
-                cursor_drawn = True
-            x += w
-            if y + self.font_medium.get_height() > max_y:
-                break
-        if not cursor_drawn and self.is_typing:
+        font_height = self.font_medium.get_height()
+        self._extend_text_layout(max_x - x0)
+
+        caret_index = min(len(self.typing), len(self.target_text))
+        visible_lines = max(1, (max_y - font_height - y0) // line_step + 1)
+        caret_line = bisect.bisect_right(self._line_starts, caret_index) - 1
+        first_line = bisect.bisect_right(self._line_starts, self.render_start_index) - 1
+        if caret_line < first_line:
+            first_line = caret_line
+        elif caret_line >= first_line + visible_lines:
+            first_line = caret_line - visible_lines + 1
+        self.render_start_index = self._line_starts[first_line]
+        last_line = min(len(self._line_starts), first_line + visible_lines)
+
+        for line in range(first_line, last_line):
+            surface = self._render_text_line(line, font_height)
+            self.screen.blit(surface, (x0, y0 + (line - first_line) * line_step))
+        if len(self._line_cache) > visible_lines * 2:
+            self._line_cache = {line: entry for line, entry in self._line_cache.items() if first_line <= line < last_line}
+
+        if self.is_typing:
             cursor_time = time.time() * 2
             if int(cursor_time) % 2 == 0:
-                cursor_height = self.font_medium.get_height()
-                pygame.draw.line(self.screen, PRIMARY_BLUE, (x0, y0), (x0, y0 + cursor_height), 3)
+                if caret_index < len(self._glyph_x):
+                    cursor_x = x0 + self._glyph_x[caret_index]
+                else:
+                    cursor_x = x0 + self._layout_x
+                cursor_y = y0 + (caret_line - first_line) * line_step
+                pygame.draw.line(self.screen, PRIMARY_BLUE, (cursor_x, cursor_y), (cursor_x, cursor_y + font_height), 3)
 
     def draw_results(self):
         if self.current_width != GAME_WIDTH or self.current_height != GAME_HEIGHT:
@@ -441,6 +494,7 @@ class TypingGame:
             self.n_gram = 4
             self.base_target_len = 10
             self.avg_word_len = 8.0
+        self.phrase_prefetcher.prime(self.difficulty, self.n_gram)
         try:
             random.seed()
             approx_chars_per_phrase = int(self.base_target_len * (self.avg_word_len + 1))
@@ -459,9 +513,8 @@ class TypingGame:
                 self.target_text = " ".join(phrase for phrase in test_phrases if phrase.strip())
             self.total_chars = len(self.target_text)
             self.state = GAME
-            self.typing_text = ""
+            self.typing.reset()
             self.current_char_index = 0
-            self.correct_chars = 0
             self.is_typing = False
             self.time_remaining = float(self.time_limit)
             self.render_start_index = 0
@@ -469,16 +522,13 @@ class TypingGame:
             print(f"Error generating text: {e}")
             self.target_text = "The quick brown fox jumps over the lazy dog. This is a sample text for typing practice."
             self.total_chars = len(self.target_text)
+            self.typing.reset()
             self.state = GAME
 
     def handle_typing(self, event):
         if event.key == pygame.K_BACKSPACE:
-            if self.typing_text:
-                self.typing_text = self.typing_text[:-1]
-                self.correct_chars = 0
-                for i in range(len(self.typing_text)):
-                    if i < len(self.target_text) and self.typing_text[i] == self.target_text[i]:
-                        self.correct_chars += 1
+            elapsed = time.time() - self.start_time if self.is_typing else 0.0
+            self.typing.backspace(elapsed)
         elif event.key == pygame.K_RETURN:
             pass
         else:
@@ -486,18 +536,19 @@ class TypingGame:
                 self.is_typing = True
                 self.start_time = time.time()
             char = event.unicode
-            if char.isprintable():
-                self.typing_text += char
-                if len(self.typing_text) <= len(self.target_text):
-                    if char == self.target_text[len(self.typing_text) - 1]:
-                        self.correct_chars += 1
+            if char and char.isprintable():
+                index = len(self.typing)
+                expected = self.target_text[index] if index < len(self.target_text) else None
+                is_correct = self.typing.append(char, expected, time.time() - self.start_time)
+                if expected is not None:
+                    if is_correct:
                         self.create_particles(GAME_WIDTH // 2, GAME_HEIGHT // 2, SUCCESS_GREEN, 8)
                     else:
                         self.create_particles(GAME_WIDTH // 2, GAME_HEIGHT // 2, ERROR_RED, 5)
-                remaining_chars = len(self.target_text) - len(self.typing_text)
+                remaining_chars = len(self.target_text) - len(self.typing)
                 if self.is_typing and self.time_remaining > 0.2 and remaining_chars < 150:
                     self.refill_target_text()
-                if len(self.typing_text) >= len(self.target_text):
+                if len(self.typing) >= len(self.target_text):
                     if self.is_typing and self.time_remaining > 0.2:
                         self.refill_target_text()
                     else:
@@ -511,14 +562,15 @@ class TypingGame:
             extra_phrases = max(3, min(40, (needed_chars + approx_chars_per_phrase - 1) // approx_chars_per_phrase))
             extra_phrases += random.randint(-1, 2)
             extra_phrases = max(2, min(50, extra_phrases))
-            generator = Ngrams(corpus_file="corpora/corpora.pkl", n=self.n_gram, num_phrases=extra_phrases, difficulty=self.difficulty.lower())
-            more_phrases = generator.generate_phrases()
+            more_phrases = self.phrase_prefetcher.take(self.difficulty, self.n_gram, extra_phrases)
             extra_text = " ".join(p for p in more_phrases if p.strip())
-            if extra_text:
-                if self.target_text and not self.target_text.endswith(" "):
-                    self.target_text += " "
-                self.target_text += extra_text
-                self.total_chars = len(self.target_text)
+            if not extra_text:
+                # the prefetch worker has not caught up; never generate on the key handler
+                extra_text = "keep typing to improve your speed and accuracy."
+            if self.target_text and not self.target_text.endswith(" "):
+                self.target_text += " "
+            self.target_text += extra_text
+            self.total_chars = len(self.target_text)
         except Exception:
             fallback = " keep typing to improve your speed and accuracy."
             self.target_text += fallback
@@ -535,7 +587,7 @@ class TypingGame:
             self.wpm = (self.correct_chars / 5) / elapsed_minutes
         else:
             self.wpm = 0
-        typed_chars = len(self.typing_text)
+        typed_chars = len(self.typing)
         if typed_chars > 0:
             self.accuracy = (self.correct_chars / typed_chars) * 100
             
@@ -559,11 +611,19 @@ class TypingGame:
         self.state = RESULTS
 
     def run(self):
+        profiler = self.profiler
         running = True
         while running:
+            if profiler.enabled:
+                profiler.begin_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.KEYDOWN and profiler.enabled and event.key in (pygame.K_F3, pygame.K_F4):
+                    if event.key == pygame.K_F3:
+                        profiler.show_hud = not profiler.show_hud
+                    else:
+                        profiler.dump_trace()
                 elif event.type == pygame.KEYDOWN:
                     if self.state == GAME:
                         self.handle_typing(event)
@@ -604,7 +664,13 @@ class TypingGame:
                 self.draw_game()
             elif self.state == RESULTS:
                 self.draw_results()
+            if profiler.enabled:
+                profiler.draw_hud(self.screen)
             pygame.display.flip()
+            if profiler.enabled:
+                profiler.end_frame(self.state)
             self.clock.tick(FPS)
+        profiler.dump_trace()
+        self.phrase_prefetcher.stop()
         pygame.quit()
 
@@ -1,48 +1,121 @@
 import random
 import math
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pygame
 
+# Sprites are cached per (color, starting size, life step, rotation step). Size
+# and alpha both follow life, and a square repeats every quarter turn.
+LIFE_STEPS = 32
+ROTATION_STEPS = 12
 
-class Particle:
-    def __init__(self, x: float, y: float, color: Tuple[int, int, int], velocity: Tuple[float, float]):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.vx, self.vy = velocity
-        self.life = 1.0
-        self.decay = random.uniform(0.015, 0.035)
-        self.size = random.randint(2, 6)
-        self.original_size = self.size
-        self.rotation = random.uniform(0, 360)
-        self.rotation_speed = random.uniform(-3, 3)
-        self.alpha = 255
-
-    def update(self) -> None:
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.12
-        self.life -= self.decay
-        self.size = max(0, self.original_size * self.life)
-        self.rotation += self.rotation_speed
-        self.alpha = int(255 * self.life)
-        self.vx += random.uniform(-0.05, 0.05)
+_sprite_cache: Dict[Tuple[Tuple[int, int, int], int, int, int], Optional[pygame.Surface]] = {}
 
-    def draw(self, screen: pygame.Surface) -> None:
-        if self.life <= 0:
-            return
-        surf = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
+
+def _sprite(color: Tuple[int, int, int], original_size: int, life_step: int, rotation_step: int) -> Optional[pygame.Surface]:
+    key = (color, original_size, life_step, rotation_step)
+    if key in _sprite_cache:
+        return _sprite_cache[key]
+    life = life_step / LIFE_STEPS
+    size = original_size * life
+    surf = None
+    if int(size * 2) > 0:
+        surf = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+        rotation = rotation_step * 90 / ROTATION_STEPS
         points = []
         for i in range(4):
-            angle = (i * 90 + self.rotation) * math.pi / 180
-            radius = self.size
-            x = self.size + radius * math.cos(angle)
-            y = self.size + radius * math.sin(angle)
-            points.append((x, y))
-        if len(points) >= 3:
-            pygame.draw.polygon(surf, self.color, points)
-            surf.set_alpha(self.alpha)
-        screen.blit(surf, (self.x - self.size, self.y - self.size))
+            angle = (i * 90 + rotation) * math.pi / 180
+            points.append((size + size * math.cos(angle), size + size * math.sin(angle)))
+        pygame.draw.polygon(surf, color, points)
+        surf.set_alpha(int(255 * life))
+    _sprite_cache[key] = surf
+    return surf
+
+
+class ParticleSystem:
+    """Particles stored as parallel lists, updated in one pass and drawn from cached sprites."""
+
+    def __init__(self):
+        self.x: List[float] = []
+        self.y: List[float] = []
+        self.vx: List[float] = []
+        self.vy: List[float] = []
+        self.life: List[float] = []
+        self.decay: List[float] = []
+        self.size: List[int] = []
+        self.rotation: List[float] = []
+        self.rotation_speed: List[float] = []
+        self.color: List[Tuple[int, int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.x)
 
+    def emit(self, x: float, y: float, color: Tuple[int, int, int], velocity: Tuple[float, float], life: float = 1.0) -> None:
+        self.x.append(x)
+        self.y.append(y)
+        self.vx.append(velocity[0])
+        self.vy.append(velocity[1])
+        self.life.append(life)
+        self.decay.append(random.uniform(0.015, 0.035))
+        self.size.append(random.randint(2, 6))
+        self.rotation.append(random.uniform(0, 360))
+        self.rotation_speed.append(random.uniform(-3, 3))
+        self.color.append(color)
 
+    def clear(self) -> None:
+        for column in self._columns():
+            column.clear()
+
+    def _columns(self) -> tuple:
+        return (self.x, self.y, self.vx, self.vy, self.life, self.decay,
+                self.size, self.rotation, self.rotation_speed, self.color)
+
+    def update(self, respawn_area: Optional[Tuple[int, int]] = None) -> None:
+        """Advance every particle one frame.
+
+        Spent particles are moved to a random point inside respawn_area with a
+        fresh life, or removed when no area is given.
+        """
+        x, y, vx, vy = self.x, self.y, self.vx, self.vy
+        life, decay, rotation, rotation_speed = self.life, self.decay, self.rotation, self.rotation_speed
+        uniform = random.uniform
+        dead = []
+        for i in range(len(x)):
+            x[i] += vx[i]
+            y[i] += vy[i]
+            vy[i] += 0.12
+            life[i] -= decay[i]
+            rotation[i] += rotation_speed[i]
+            vx[i] += uniform(-0.05, 0.05)
+            if life[i] <= 0:
+                dead.append(i)
+        if not dead:
+            return
+        if respawn_area is not None:
+            width, height = respawn_area
+            for i in dead:
+                x[i] = random.randint(0, width)
+                y[i] = random.randint(0, height)
+                life[i] = random.uniform(0.3, 0.7)
+            return
+        # swap-remove from the back so earlier indices stay valid
+        columns = self._columns()
+        for i in reversed(dead):
+            for column in columns:
+                column[i] = column[-1]
+                column.pop()
+
+    def draw(self, screen: pygame.Surface) -> None:
+        blits = []
+        x, y, life, size, rotation, color = self.x, self.y, self.life, self.size, self.rotation, self.color
+        for i in range(len(x)):
+            if life[i] <= 0:
+                continue
+            life_step = min(LIFE_STEPS, int(life[i] * LIFE_STEPS + 0.5))
+            rotation_step = int(rotation[i] * ROTATION_STEPS / 90) % ROTATION_STEPS
+            surf = _sprite(color[i], size[i], life_step, rotation_step)
+            if surf is not None:
+                half = surf.get_width() / 2
+                blits.append((surf, (x[i] - half, y[i] - half)))
+        if blits:
+            screen.blits(blits, doreturn=False)
@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ngrams import Ngrams
+
+
+class PhrasePrefetcher:
+    def __init__(self, corpus_file: str = "corpora/corpora.pkl", capacity: int = 60, batch_size: int = 10):
+        self.corpus_file = corpus_file
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self._buffers: Dict[Tuple[str, int], Deque[str]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def prime(self, difficulty: str, n: int) -> None:
+        key = (difficulty.lower(), int(n))
+        with self._cond:
+            self._buffers.setdefault(key, deque())
+            # a worker that is still finishing a batch after stop() is reused
+            # rather than joined by a second one on the same buffers
+            self._stopped = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="phrase-prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def take(self, difficulty: str, n: int, count: int) -> List[str]:
+        key = (difficulty.lower(), int(n))
+        with self._cond:
+            buffer = self._buffers.setdefault(key, deque())
+            phrases = [buffer.popleft() for _ in range(min(count, len(buffer)))]
+            self._cond.notify()
+        return phrases
+
+    def available(self, difficulty: str, n: int) -> int:
+        with self._cond:
+            return len(self._buffers.get((difficulty.lower(), int(n)), ()))
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+        # the worker clears self._thread itself once it has exited
+        if thread is not None:
+            thread.join(timeout=1.0)
+
+    def _next_key(self) -> Optional[Tuple[str, int]]:
+        for key, buffer in self._buffers.items():
+            if len(buffer) < self.capacity:
+                return key
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                key = self._next_key()
+                while key is None and not self._stopped:
+                    self._cond.wait()
+                    key = self._next_key()
+                if self._stopped:
+                    self._thread = None
+                    return
+
+            difficulty, n = key
+            try:
+                generator = Ngrams(corpus_file=self.corpus_file, n=n, num_phrases=self.batch_size, difficulty=difficulty)
+                phrases = [p for p in generator.generate_phrases() if p.strip()]
+            except Exception as e:
+                print(f"Phrase prefetch failed for {difficulty} (n={n}): {e}")
+                phrases = []
+
+            with self._cond:
+                buffer = self._buffers.setdefault(key, deque())
+                room = max(0, self.capacity - len(buffer))
+                buffer.extend(phrases[:room])
+                if not phrases:
+                    # back off instead of spinning on a broken corpus
+                    self._cond.wait(timeout=1.0)
@@ -0,0 +1,135 @@
+import json
+import time
+import functools
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+import pygame
+
+from .constants import WHITE, BG_DARKEST, WARNING_ORANGE, ERROR_RED, FPS
+
+HUD_REFRESH_FRAMES = 15
+HUD_WINDOW_FRAMES = 240
+TRACE_MAX_FRAMES = 60 * 60 * FPS
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    """Per-phase frame timings with a rolling percentile overlay and a JSON trace.
+
+    Disabled profilers never wrap anything, so the game loop pays one attribute
+    check per frame.
+    """
+
+    def __init__(self, enabled: bool = False, trace_file: Optional[str] = None,
+                 window: int = HUD_WINDOW_FRAMES, max_trace_frames: int = TRACE_MAX_FRAMES):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.show_hud = enabled
+        self.frames: Deque[float] = deque(maxlen=window)
+        self.phases: Dict[str, Deque[float]] = {}
+        self.trace: Deque[dict] = deque(maxlen=max_trace_frames)
+        self.frame_index = 0
+        self._frame_start = 0.0
+        self._current: Dict[str, float] = {}
+        self._hud_lines: List[str] = []
+        self._hud_surface: Optional[pygame.Surface] = None
+        self._font: Optional[pygame.font.Font] = None
+
+    def instrument(self, obj, names: Iterable[str]) -> None:
+        """Replace obj's methods with timed wrappers that add to the current frame."""
+        if not self.enabled:
+            return
+        for name in names:
+            method = getattr(obj, name)
+            setattr(obj, name, self._timed(name, method))
+
+    def _timed(self, name: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return wrapper
+
+    def add(self, name: str, seconds: float) -> None:
+        self._current[name] = self._current.get(name, 0.0) + seconds
+
+    def begin_frame(self) -> None:
+        self._frame_start = time.perf_counter()
+        self._current = {}
+
+    def end_frame(self, state: str = "") -> None:
+        """Close the frame; call before clock.tick so idle time is not counted."""
+        elapsed = time.perf_counter() - self._frame_start
+        self.frames.append(elapsed)
+        for name, seconds in self._current.items():
+            self.phases.setdefault(name, deque(maxlen=self.frames.maxlen)).append(seconds)
+        self.trace.append({
+            "frame": self.frame_index,
+            "t": round(self._frame_start, 6),
+            "state": state,
+            "ms": round(elapsed * 1000, 3),
+            "phases": {name: round(seconds * 1000, 3) for name, seconds in self._current.items()},
+        })
+        self.frame_index += 1
+        if self.frame_index % HUD_REFRESH_FRAMES == 0:
+            self._hud_surface = None
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 in milliseconds over the rolling window, for the frame and each phase."""
+        rows = {"frame": self.frames, **self.phases}
+        result = {}
+        for name, values in rows.items():
+            ordered = sorted(values)
+            result[name] = {
+                "p50": percentile(ordered, 0.50) * 1000,
+                "p95": percentile(ordered, 0.95) * 1000,
+                "p99": percentile(ordered, 0.99) * 1000,
+            }
+        return result
+
+    def draw_hud(self, screen: pygame.Surface) -> None:
+        if not (self.enabled and self.show_hud):
+            return
+        if self._hud_surface is None:
+            self._hud_surface = self._render_hud()
+        screen.blit(self._hud_surface, (screen.get_width() - self._hud_surface.get_width() - 10, 10))
+
+    def _render_hud(self) -> pygame.Surface:
+        if self._font is None:
+            self._font = pygame.font.Font(None, 22)
+        budget_ms = 1000.0 / FPS
+        lines = [("phase            p50    p95    p99 ms", WHITE)]
+        for name, stats in self.summary().items():
+            color = ERROR_RED if stats["p95"] > budget_ms else WARNING_ORANGE if stats["p99"] > budget_ms else WHITE
+            lines.append((f"{name[:16]:<16}{stats['p50']:>6.2f} {stats['p95']:>6.2f} {stats['p99']:>6.2f}", color))
+        rendered = [self._font.render(text, True, color) for text, color in lines]
+        width = max(s.get_width() for s in rendered) + 16
+        line_height = self._font.get_linesize()
+        surface = pygame.Surface((width, line_height * len(rendered) + 12), pygame.SRCALPHA)
+        pygame.draw.rect(surface, (*BG_DARKEST, 200), surface.get_rect(), border_radius=8)
+        for i, text_surface in enumerate(rendered):
+            surface.blit(text_surface, (8, 6 + i * line_height))
+        return surface
+
+    def dump_trace(self, filename: Optional[str] = None) -> Optional[str]:
+        filename = filename or self.trace_file
+        if not (self.enabled and filename):
+            return None
+        try:
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump({"fps": FPS, "summary": self.summary(), "frames": list(self.trace)}, f)
+            print(f"Frame trace written to {filename}")
+            return filename
+        except OSError as e:
+            print(f"Could not write frame trace: {e}")
+            return None
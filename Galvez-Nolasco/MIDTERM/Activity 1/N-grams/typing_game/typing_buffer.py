@@ -0,0 +1,46 @@
+from typing import List, NamedTuple, Optional
+
+
+class Keystroke(NamedTuple):
+    elapsed: float      # seconds since the test started
+    char: str           # typed character, or "\b" for a backspace
+    index: int          # position in the target text the key applied to
+    correct: bool       # whether the typed (or, for a backspace, removed) char matched
+
+
+class TypingBuffer:
+    def __init__(self):
+        self.chars: List[str] = []
+        self.flags = bytearray()
+        self.correct = 0
+        self.keystrokes: List[Keystroke] = []
+
+    def __len__(self) -> int:
+        return len(self.chars)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chars)
+
+    def reset(self) -> None:
+        self.chars.clear()
+        self.flags.clear()
+        self.correct = 0
+        self.keystrokes.clear()
+
+    def append(self, char: str, expected: Optional[str], elapsed: float = 0.0) -> bool:
+        is_correct = expected is not None and char == expected
+        self.chars.append(char)
+        self.flags.append(1 if is_correct else 0)
+        self.correct += is_correct
+        self.keystrokes.append(Keystroke(elapsed, char, len(self.chars) - 1, is_correct))
+        return is_correct
+
+    def backspace(self, elapsed: float = 0.0) -> bool:
+        if not self.chars:
+            return False
+        self.chars.pop()
+        was_correct = self.flags.pop()
+        self.correct -= was_correct
+        self.keystrokes.append(Keystroke(elapsed, "\b", len(self.chars), bool(was_correct)))
+        return True
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import Tuple
 
 import pygame
@@ -8,6 +9,82 @@ from .constants import (
     PURE_WHITE,
 )
 
+# Faces extend this far around the button for the glow; the shadow fits inside
+FACE_MARGIN = 10
+GLOW_STEPS = 20
+FACE_CACHE_SIZE = 64
+
+
+def render_button_face(width: int, height: int, fill_color: Tuple[int, int, int], blend_color: Tuple[int, int, int],
+                       glow: float, font: pygame.font.Font, label: str, text_color: Tuple[int, int, int]) -> pygame.Surface:
+    """Glow, shadow, gradient, border, highlight and label composited into one premultiplied surface."""
+    face = pygame.Surface((width + 2 * FACE_MARGIN, height + 2 * FACE_MARGIN), pygame.SRCALPHA)
+    rect = pygame.Rect(FACE_MARGIN, FACE_MARGIN, width, height)
+
+    def layer(surface: pygame.Surface, pos) -> None:
+        # premul_alpha() returns a blank surface for font renders unless they are copied first
+        face.blit(surface.copy().premul_alpha(), pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+    if glow > 0:
+        glow_surf = pygame.Surface((width + 20, height + 20), pygame.SRCALPHA)
+        pygame.draw.rect(glow_surf, (*fill_color, int(50 * glow)), glow_surf.get_rect(), border_radius=18)
+        layer(glow_surf, (0, 0))
+    shadow_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.rect(shadow_surf, (*BLACK, 40), shadow_surf.get_rect(), border_radius=18)
+    layer(shadow_surf, rect.move(6, 6))
+    gradient_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    for y in range(height):
+        ratio = y / height
+        r = int(fill_color[0] * (1 - ratio * 0.3) + blend_color[0] * (ratio * 0.3))
+        g = int(fill_color[1] * (1 - ratio * 0.3) + blend_color[1] * (ratio * 0.3))
+        b = int(fill_color[2] * (1 - ratio * 0.3) + blend_color[2] * (ratio * 0.3))
+        pygame.draw.line(gradient_surf, (r, g, b), (0, y), (width, y))
+    layer(gradient_surf, rect)
+    border_color = tuple(min(255, c + int(20 * glow)) for c in fill_color)
+    pygame.draw.rect(face, border_color, rect, 2, border_radius=18)
+    highlight_surf = pygame.Surface((width, height // 2), pygame.SRCALPHA)
+    pygame.draw.rect(highlight_surf, (*WHITE, 25), highlight_surf.get_rect(), border_radius=18)
+    layer(highlight_surf, rect)
+    text_surface = font.render(label, True, text_color)
+    text_rect = text_surface.get_rect(center=rect.center)
+    shadow_surface = font.render(label, True, (*BLACK, 100))
+    layer(shadow_surface, shadow_surface.get_rect(center=(text_rect.centerx + 1, text_rect.centery + 1)))
+    layer(text_surface, text_rect)
+    return face
+
+
+class FaceCache:
+    """Small LRU of rendered button faces."""
+
+    def __init__(self, max_size: int = FACE_CACHE_SIZE):
+        self.max_size = max_size
+        self._faces: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+
+    def get(self, key: tuple, render) -> pygame.Surface:
+        face = self._faces.get(key)
+        if face is None:
+            face = render()
+            self._faces[key] = face
+            if len(self._faces) > self.max_size:
+                self._faces.popitem(last=False)
+        else:
+            self._faces.move_to_end(key)
+        return face
+
+    def clear(self) -> None:
+        self._faces.clear()
+
+
+def _scaled_rect(rect: pygame.Rect, scale: float) -> pygame.Rect:
+    scaled_width = int(rect.width * scale)
+    scaled_height = int(rect.height * scale)
+    return pygame.Rect(rect.centerx - scaled_width // 2, rect.centery - scaled_height // 2, scaled_width, scaled_height)
+
+
+def _glow_step(glow: float) -> float:
+    # hover animation frames snap to GLOW_STEPS levels so they can be reused
+    return round(glow * GLOW_STEPS) / GLOW_STEPS
+
 
 class ModernButton:
     def __init__(self, x: int, y: int, width: int, height: int, text: str,
@@ -26,6 +103,7 @@ class ModernButton:
         self.target_scale = 1.0
         self.glow_intensity = 0
         self.pressed = False
+        self._faces = FaceCache()
 
     def update(self, mouse_pos: Tuple[int, int]):
         was_hovered = self.hovered
@@ -48,45 +126,15 @@ class ModernButton:
             self.animation_time = 0
 
     def draw(self, screen: pygame.Surface):
-        scaled_width = int(self.rect.width * self.scale)
-        scaled_height = int(self.rect.height * self.scale)
-        scaled_x = self.rect.centerx - scaled_width // 2
-        scaled_y = self.rect.centery - scaled_height // 2
-        scaled_rect = pygame.Rect(scaled_x, scaled_y, scaled_width, scaled_height)
-        if self.glow_intensity > 0:
-            glow_rect = scaled_rect.inflate(20, 20)
-            glow_surf = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
-            glow_alpha = int(50 * self.glow_intensity)
-            pygame.draw.rect(glow_surf, (*self.current_color, glow_alpha), glow_surf.get_rect(), border_radius=18)
-            screen.blit(glow_surf, glow_rect)
-        shadow_rect = scaled_rect.copy()
-        shadow_rect.x += 6
-        shadow_rect.y += 6
-        shadow_surf = pygame.Surface((shadow_rect.width, shadow_rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surf, (*BLACK, 40), shadow_surf.get_rect(), border_radius=18)
-        screen.blit(shadow_surf, shadow_rect)
-        gradient_surf = pygame.Surface((scaled_rect.width, scaled_rect.height), pygame.SRCALPHA)
-        for y in range(scaled_rect.height):
-            ratio = y / scaled_rect.height
-            r = int(self.current_color[0] * (1 - ratio * 0.3) + self.hover_color[0] * (ratio * 0.3))
-            g = int(self.current_color[1] * (1 - ratio * 0.3) + self.hover_color[1] * (ratio * 0.3))
-            b = int(self.current_color[2] * (1 - ratio * 0.3) + self.hover_color[2] * (ratio * 0.3))
-            pygame.draw.line(gradient_surf, (r, g, b), (0, y), (scaled_rect.width, y))
-        screen.blit(gradient_surf, scaled_rect)
-        border_color = tuple(min(255, c + int(20 * self.glow_intensity)) for c in self.current_color)
-        pygame.draw.rect(screen, border_color, scaled_rect, 2, border_radius=18)
-        highlight_rect = scaled_rect.copy()
-        highlight_rect.height = highlight_rect.height // 2
-        highlight_surf = pygame.Surface((highlight_rect.width, highlight_rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(highlight_surf, (*WHITE, 25), highlight_surf.get_rect(), border_radius=18)
-        screen.blit(highlight_surf, highlight_rect)
+        scaled_rect = _scaled_rect(self.rect, self.scale)
+        glow = _glow_step(self.glow_intensity)
         display_text = f"{self.icon} {self.text}" if self.icon else self.text
-        text_surface = self.font.render(display_text, True, WHITE)
-        text_rect = text_surface.get_rect(center=scaled_rect.center)
-        shadow_surface = self.font.render(display_text, True, (*BLACK, 100))
-        shadow_rect = shadow_surface.get_rect(center=(text_rect.centerx + 1, text_rect.centery + 1))
-        screen.blit(shadow_surface, shadow_rect)
-        screen.blit(text_surface, text_rect)
+        key = (scaled_rect.size, self.current_color, glow, display_text)
+        face = self._faces.get(key, lambda: render_button_face(
+            scaled_rect.width, scaled_rect.height, self.current_color, self.hover_color,
+            glow, self.font, display_text, WHITE,
+        ))
+        screen.blit(face, scaled_rect.move(-FACE_MARGIN, -FACE_MARGIN), special_flags=pygame.BLEND_PREMULTIPLIED)
 
     def is_clicked(self, event) -> bool:
         return event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos)
@@ -108,6 +156,7 @@ class OutlineButton:
         self.hover_glow = 0.0
         self.click_flash = 0.0
         self.glow_intensity = 0.0
+        self._faces = FaceCache()
 
     def _lighten(self, color: Tuple[int, int, int], amount: float) -> Tuple[int, int, int]:
         r, g, b = color
@@ -136,56 +185,14 @@ class OutlineButton:
             self.glow_intensity += (0.0 - self.glow_intensity) * 0.1
 
     def draw(self, screen: pygame.Surface) -> None:
-        scaled_width = int(self.rect.width * self.scale)
-        scaled_height = int(self.rect.height * self.scale)
-        scaled_x = self.rect.centerx - scaled_width // 2
-        scaled_y = self.rect.centery - scaled_height // 2
-        scaled_rect = pygame.Rect(scaled_x, scaled_y, scaled_width, scaled_height)
-        
-        # Glass effect glow (same as ModernButton)
-        if self.glow_intensity > 0:
-            glow_rect = scaled_rect.inflate(20, 20)
-            glow_surf = pygame.Surface((glow_rect.width, glow_rect.height), pygame.SRCALPHA)
-            glow_alpha = int(50 * self.glow_intensity)
-            pygame.draw.rect(glow_surf, (*self.border_color, glow_alpha), glow_surf.get_rect(), border_radius=18)
-            screen.blit(glow_surf, glow_rect)
-        
-        # Shadow effect
-        shadow_rect = scaled_rect.copy()
-        shadow_rect.x += 6
-        shadow_rect.y += 6
-        shadow_surf = pygame.Surface((shadow_rect.width, shadow_rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surf, (*BLACK, 40), shadow_surf.get_rect(), border_radius=18)
-        screen.blit(shadow_surf, shadow_rect)
-        
-        # Gradient fill (glass effect)
-        gradient_surf = pygame.Surface((scaled_rect.width, scaled_rect.height), pygame.SRCALPHA)
-        for y in range(scaled_rect.height):
-            ratio = y / scaled_rect.height
-            r = int(self.border_color[0] * (1 - ratio * 0.3) + self._lighten(self.border_color, 0.3)[0] * (ratio * 0.3))
-            g = int(self.border_color[1] * (1 - ratio * 0.3) + self._lighten(self.border_color, 0.3)[1] * (ratio * 0.3))
-            b = int(self.border_color[2] * (1 - ratio * 0.3) + self._lighten(self.border_color, 0.3)[2] * (ratio * 0.3))
-            pygame.draw.line(gradient_surf, (r, g, b), (0, y), (scaled_rect.width, y))
-        screen.blit(gradient_surf, scaled_rect)
-        
-        # Border with glow intensity
-        border_color = tuple(min(255, c + int(20 * self.glow_intensity)) for c in self.border_color)
-        pygame.draw.rect(screen, border_color, scaled_rect, 2, border_radius=18)
-        
-        # Highlight effect (glass shine)
-        highlight_rect = scaled_rect.copy()
-        highlight_rect.height = highlight_rect.height // 2
-        highlight_surf = pygame.Surface((highlight_rect.width, highlight_rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(highlight_surf, (*WHITE, 25), highlight_surf.get_rect(), border_radius=18)
-        screen.blit(highlight_surf, highlight_rect)
-        
-        # Text with shadow
-        text_surface = self.font.render(self.text, True, PURE_WHITE)
-        text_rect = text_surface.get_rect(center=scaled_rect.center)
-        shadow_surface = self.font.render(self.text, True, (*BLACK, 100))
-        shadow_rect = shadow_surface.get_rect(center=(text_rect.centerx + 1, text_rect.centery + 1))
-        screen.blit(shadow_surface, shadow_rect)
-        screen.blit(text_surface, text_rect)
+        scaled_rect = _scaled_rect(self.rect, self.scale)
+        glow = _glow_step(self.glow_intensity)
+        key = (scaled_rect.size, self.border_color, glow, self.text)
+        face = self._faces.get(key, lambda: render_button_face(
+            scaled_rect.width, scaled_rect.height, self.border_color, self._lighten(self.border_color, 0.3),
+            glow, self.font, self.text, PURE_WHITE,
+        ))
+        screen.blit(face, scaled_rect.move(-FACE_MARGIN, -FACE_MARGIN), special_flags=pygame.BLEND_PREMULTIPLIED)
 
     def is_clicked(self, event) -> bool:
         if event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos):
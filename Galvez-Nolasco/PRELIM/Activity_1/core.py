@@ -3,6 +3,41 @@ import os
 import re
 import random
 
+NON_WORD_RE = re.compile(r"[^\w\s']")
+TOKEN_RE = re.compile(r'\b\w{2,}\b')
+WORD_RE = re.compile(r"\w+")
+MY_NAME_RE = re.compile(r"\bmy name is ([a-zA-Z]+)\b")
+ASK_NAME_RE = re.compile(r"\b(what's my name|who am i)\b")
+
+# Patterns made only of \b, word characters, spaces, apostrophes, hyphens and
+# "?" can be indexed by the whole words they require; anything else is always tried.
+UNINDEXABLE_CHARS = set("()[]{}.*+^$\\")
+WORD_EDGES = {"\0", " ", "-", "'"}
+
+
+def pattern_keywords(pattern):
+    """Return one required word per alternative of pattern, or None if it can't be indexed."""
+    keywords = set()
+    for branch in pattern.split("|"):
+        branch = branch.replace("\\b", "\0")
+        if UNINDEXABLE_CHARS & set(branch):
+            return None
+        best = None
+        for m in WORD_RE.finditer(branch):
+            start, end = m.start(), m.end()
+            before = branch[start - 1] if start > 0 else None
+            after = branch[end] if end < len(branch) else None
+            after_optional = branch[end + 1:end + 2] == "?"
+            if before in WORD_EDGES and after in WORD_EDGES and not after_optional:
+                word = m.group().lower()
+                if best is None or len(word) > len(best):
+                    best = word
+        if best is None:
+            return None
+        keywords.add(best)
+    return keywords
+
+
 class ChatbotCore:
     def __init__(self, db_path="chatbot_database.json"):
         self.db_path = db_path
@@ -10,6 +45,10 @@ class ChatbotCore:
         self.bot_name = "Buddy"
         self.total_messages = 0
         self.knowledge_patterns = []
+        self._compiled_patterns = []
+        self._keyword_index = {}
+        self._unindexed_patterns = []
+        self._indexed_source = None
 
         self.stop_words_list = [
             "i", "me", "my", "myself", "we", "our", "ours", "ourselves",
@@ -53,6 +92,40 @@ class ChatbotCore:
 
         self.knowledge_patterns = data.get("patterns", [])
         self.total_messages = data.get("total_messages", 0)
+        self.compile_patterns()
+
+    def compile_patterns(self):
+        self._compiled_patterns = []
+        self._keyword_index = {}
+        self._unindexed_patterns = []
+        for i, pattern in enumerate(self.knowledge_patterns):
+            try:
+                regex = re.compile(pattern["pattern"], re.IGNORECASE)
+            except Exception as e:
+                print(f"⚠️ Regex failed: {e}")
+                regex = None
+            self._compiled_patterns.append(regex)
+            if regex is None:
+                continue
+
+            keywords = pattern_keywords(pattern["pattern"])
+            if keywords is None:
+                self._unindexed_patterns.append(i)
+            else:
+                for word in keywords:
+                    self._keyword_index.setdefault(word, []).append(i)
+        self._indexed_source = (self.knowledge_patterns, len(self.knowledge_patterns))
+
+    def match_patterns(self, user_input):
+        if self._indexed_source != (self.knowledge_patterns, len(self.knowledge_patterns)):
+            self.compile_patterns()
+
+        candidates = set(self._unindexed_patterns)
+        for word in set(WORD_RE.findall(user_input.lower())):
+            candidates.update(self._keyword_index.get(word, ()))
+
+        return [self.knowledge_patterns[i] for i in sorted(candidates)
+                if self._compiled_patterns[i].search(user_input)]
 
     def save_database(self):
         try:
@@ -72,8 +145,8 @@ class ChatbotCore:
         return synonyms.get(word, word)
 
     def tokenize_and_match(self, text, pattern=None):
-        cleaned = re.sub(r"[^\w\s']", "", text.lower())
-        raw_tokens = re.findall(r'\b\w{2,}\b', cleaned)
+        cleaned = NON_WORD_RE.sub("", text.lower())
+        raw_tokens = TOKEN_RE.findall(cleaned)
         tokens = [self.map_synonym(t) for t in raw_tokens if t not in self.stop_words_list]
 
         if pattern:
@@ -107,23 +180,16 @@ class ChatbotCore:
         if any(p in lower_input for p in bot_name_patterns) and any(p in lower_input for p in user_name_patterns):
             return f"I'm {self.bot_name} and your name is {self.user_name}!"
 
-        tokens, match = self.tokenize_and_match(user_input, r"\bmy name is ([a-zA-Z]+)\b")
+        cleaned = NON_WORD_RE.sub("", lower_input)
+        match = MY_NAME_RE.search(cleaned)
         if match:
             self.user_name = match.group(1).capitalize()
             return f"Nice to meet you, {self.user_name}! 😊"
 
-        _, match = self.tokenize_and_match(user_input, r"\b(what's my name|who am i)\b")
-        if match:
+        if ASK_NAME_RE.search(cleaned):
             return f"You're {self.user_name}! 😄" if self.user_name != "friend" else "I don't know your name yet! Say 'My name is [your name]' 😊"
 
-        matched_patterns = []
-        for pattern in self.knowledge_patterns:
-            try:
-                regex = re.compile(pattern["pattern"], re.IGNORECASE)
-                if regex.search(user_input):
-                    matched_patterns.append(pattern)
-            except Exception as e:
-                print(f"⚠️ Regex failed: {e}")
+        matched_patterns = self.match_patterns(user_input)
 
         if matched_patterns:
             pattern_strings = [p["pattern"] for p in matched_patterns]
@@ -2,6 +2,8 @@ import re
 import json
 import os
 import random
+import threading
+from collections import OrderedDict
 
 class Tokenizer:
     def __init__(self):
@@ -10,20 +12,115 @@ class Tokenizer:
     def tokenize(self, text):
         return self.pattern.findall(text)
 
+class ObservedDict(dict):
+    """A dict that calls on_change after every mutation."""
+
+    def __init__(self, data, on_change):
+        super().__init__(data)
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def __ior__(self, other):
+        super().update(other)
+        self._on_change()
+        return self
+
+    def clear(self):
+        super().clear()
+        self._on_change()
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._on_change()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_change()
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._on_change()
+        return value
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._on_change()
+
 class JejemonNormalizer:
-    def __init__(self):
+    def __init__(self, cache_size=4096):
         data_path = os.path.join(os.path.dirname(__file__), 'data.json')
         with open(data_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
-        self.word_map = data["word_map"]
-        self.reverse_word_map = {v: k for k, v in self.word_map.items()}
-        self.char_map = {
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._word_map = ObservedDict(data["word_map"], self._maps_changed)
+        self._char_map = ObservedDict({
             replacement: letter
             for letter, replacements in data["char_map"].items()
             for replacement in replacements
-        }
+        }, self._maps_changed)
         self.original_char_map = data["char_map"]
+        self._maps_changed()
+
+    @property
+    def word_map(self):
+        return self._word_map
+
+    @word_map.setter
+    def word_map(self, value):
+        self._word_map = ObservedDict(value, self._maps_changed)
+        self._maps_changed()
+
+    @property
+    def char_map(self):
+        return self._char_map
+
+    @char_map.setter
+    def char_map(self, value):
+        self._char_map = ObservedDict(value, self._maps_changed)
+        self._maps_changed()
+
+    def _maps_changed(self):
+        self.reverse_word_map = {v: k for k, v in self.word_map.items()}
+        self._char_replacer = compile_replacer(self.char_map)
+        self._build_fuzzy_index()
+        self.clear_cache()
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_generation += 1
+
+    def cache_info(self):
+        with self._cache_lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "size": len(self._cache),
+                "max_size": self.cache_size,
+            }
+
+    def _build_fuzzy_index(self):
+        # First word_map key per vowel-less skeleton, matching the old linear scan order
+        self.skeleton_map = {}
+        for jej_word in self.word_map:
+            self.skeleton_map.setdefault(self.remove_vowels(jej_word), jej_word)
+        self.deletion_index = DeletionIndex(self.word_map.keys())
 
     def preserve_casing(self, original, converted):
         if original.isupper():
@@ -41,31 +138,46 @@ class JejemonNormalizer:
 
         lowered = token.lower()
 
+        with self._cache_lock:
+            normalized = self._cache.get(lowered)
+            if normalized is not None:
+                self._cache.move_to_end(lowered)
+                self.cache_hits += 1
+                return self.preserve_casing(token, normalized)
+            self.cache_misses += 1
+            generation = self._cache_generation
+
+        normalized = self._normalize_lowered(lowered)
+
+        with self._cache_lock:
+            # skip results computed against maps that changed meanwhile
+            if generation == self._cache_generation and self.cache_size > 0:
+                self._cache[lowered] = normalized
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return self.preserve_casing(token, normalized)
+
+    def _normalize_lowered(self, lowered):
         if len(lowered) <= 2 and lowered not in self.word_map:
-            replaced = self._multi_replace(lowered, self.char_map)
-            return self.preserve_casing(token, replaced)
+            return self._multi_replace(lowered, self.char_map)
 
         if lowered in self.word_map:
-            normalized = self.word_map[lowered]
-            return self.preserve_casing(token, normalized)
+            return self.word_map[lowered]
 
-        token_no_vowels = self.remove_vowels(lowered)
-        for jej_word, tag_word in self.word_map.items():
-            if self.remove_vowels(jej_word) == token_no_vowels:
-                return self.preserve_casing(token, tag_word)
+        jej_word = self.skeleton_map.get(self.remove_vowels(lowered))
+        if jej_word is not None:
+            return self.word_map[jej_word]
 
-        corrected, dist = find_closest_word(lowered, self.word_map.keys(), max_distance=1)
+        corrected, dist = self.deletion_index.find_closest(lowered, max_distance=1)
         if corrected:
-            normalized = self.word_map[corrected]
-            return self.preserve_casing(token, normalized)
+            return self.word_map[corrected]
 
-        normalized = self._multi_replace(lowered, self.char_map)
-        return self.preserve_casing(token, normalized)
+        return self._multi_replace(lowered, self.char_map)
 
     def _multi_replace(self, text, replace_map):
-        for key in sorted(replace_map, key=len, reverse=True):
-            text = text.replace(key, replace_map[key])
-        return text
+        if replace_map is self.char_map:
+            return self._char_replacer(text)
+        return compile_replacer(replace_map)(text)
 
     def normalize(self, text, tokenizer=None, max_passes=3):
         if tokenizer is None:
@@ -80,32 +192,42 @@ class JejemonNormalizer:
 
         return "".join(tokens)
 
-    def jejemonize_token(self, token, seed=None):
+    def jejemonize_token(self, token, seed=None, rng=None):
         if token.strip() == "":
             return token
 
-        if seed is not None:
-            random.seed(seed)
+        # A seed gives every token a fresh generator, as the old global reseed did;
+        # an injected rng is drawn from as one stream; neither uses the module RNG.
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
 
         lowered = token.lower()
 
         if lowered in self.reverse_word_map:
             jej = self.reverse_word_map[lowered]
         else:
-            jej = ""
-            for c in lowered:
-                if c in self.original_char_map:
-                    jej += random.choice(self.original_char_map[c])
-                else:
-                    jej += c
+            char_map = self.original_char_map
+            jej = "".join(rng.choice(char_map[c]) if c in char_map else c for c in lowered)
 
         return self.preserve_casing(token, jej)
 
-    def jejemonize(self, text, tokenizer=None, seed=None):
+    def jejemonize(self, text, tokenizer=None, seed=None, rng=None):
         if tokenizer is None:
             tokenizer = Tokenizer()
         tokens = tokenizer.tokenize(text)
-        return "".join([self.jejemonize_token(tok, seed=seed) for tok in tokens])
+        return "".join([self.jejemonize_token(tok, seed=seed, rng=rng) for tok in tokens])
+
+def compile_replacer(replace_map):
+    """Rewrite text in one left-to-right scan, trying longer keys first.
+
+    Replaced text is not scanned again, so keys never chain; for data.json
+    this gives the same output as replacing key by key, longest first.
+    """
+    if not replace_map:
+        return lambda text: text
+    keys = sorted(replace_map, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(key) for key in keys))
+    return lambda text: pattern.sub(lambda m: replace_map[m.group()], text)
 
 def edit_distance(s1, s2):
     if len(s1) < len(s2):
@@ -135,3 +257,34 @@ def find_closest_word(word, word_list, max_distance=1):
     if closest_distance is not None and closest_distance <= max_distance:
         return closest_word, closest_distance
     return None, None
+
+def single_deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+class DeletionIndex:
+    """SymSpell-style index of words and their single-character deletions."""
+
+    def __init__(self, words):
+        self.words = list(words)
+        self.position = {word: i for i, word in reversed(list(enumerate(self.words)))}
+        self.deletes = {}
+        for i, word in enumerate(self.words):
+            for variant in single_deletes(word) | {word}:
+                self.deletes.setdefault(variant, []).append(i)
+
+    def find_closest(self, word, max_distance=1):
+        if max_distance > 1:
+            return find_closest_word(word, self.words, max_distance)
+        if word in self.position:
+            return word, 0
+        if max_distance < 1:
+            return None, None
+
+        # Any word within distance 1 shares word itself or one of its deletions
+        candidates = set(self.deletes.get(word, ()))
+        for variant in single_deletes(word):
+            candidates.update(self.deletes.get(variant, ()))
+        for i in sorted(candidates):
+            if edit_distance(word, self.words[i]) == 1:
+                return self.words[i], 1
+        return None, None
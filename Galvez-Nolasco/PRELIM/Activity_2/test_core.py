@@ -0,0 +1,126 @@
+import random
+
+from core import JejemonNormalizer, compile_replacer, find_closest_word
+
+
+def _loop_replace(text, replace_map):
+    # the per-key str.replace loop that compile_replacer replaced
+    for key in sorted(replace_map, key=len, reverse=True):
+        text = text.replace(key, replace_map[key])
+    return text
+
+
+def test_char_replacer(trials=20000):
+    try:
+        normalizer = JejemonNormalizer()
+        char_map = normalizer.char_map
+        rng = random.Random(11)
+        alphabet = list(char_map) + list("abcdefghijklmnopqrstuvwxyz") + [" ", "."]
+        for _ in range(trials):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert normalizer._multi_replace(text, char_map) == _loop_replace(text, char_map), repr(text)
+        print(f"✅ char_map replacer matches the replace loop ({trials} strings)")
+
+        # Longest key wins at each position, scanning left to right
+        replace = compile_replacer({"ph": "f", "p": "b", "hh": "H", "pha": "X", "a": "4"})
+        assert replace("phhp") == "fhb"
+        assert replace("phap") == "Xb"
+        assert replace("phhh") == "fH"
+        assert replace("aphaa") == "4X4"
+        # Overlapping matches do not chain, and replacements are not scanned again
+        replace = compile_replacer({"aa": "b", "ab": "c", "b": "a"})
+        assert replace("aaa") == "ba"
+        assert replace("aab") == "ba"
+        assert replace("abb") == "ca"
+        assert compile_replacer({})("text") == "text"
+        print("✅ Overlapping and multi-character keys")
+        return True
+    except Exception as e:
+        print(f"❌ char_map replacer test failed: {e!r}")
+        return False
+
+
+def _scan_normalize_token(normalizer, token):
+    # normalize_token as it was before the fuzzy index and cache: linear scans over word_map
+    if token.strip() == "":
+        return token
+    lowered = token.lower()
+    word_map = normalizer.word_map
+    if len(lowered) <= 2 and lowered not in word_map:
+        return normalizer.preserve_casing(token, _loop_replace(lowered, normalizer.char_map))
+    if lowered in word_map:
+        return normalizer.preserve_casing(token, word_map[lowered])
+    skeleton = normalizer.remove_vowels(lowered)
+    for jej_word, tag_word in word_map.items():
+        if normalizer.remove_vowels(jej_word) == skeleton:
+            return normalizer.preserve_casing(token, tag_word)
+    corrected, _ = find_closest_word(lowered, word_map.keys(), max_distance=1)
+    if corrected:
+        return normalizer.preserve_casing(token, word_map[corrected])
+    return normalizer.preserve_casing(token, _loop_replace(lowered, normalizer.char_map))
+
+
+def _random_token(rng, keys):
+    letters = "abcdefghijklmnopqrstuvwxyz4@3!10$"
+    token = list(rng.choice(keys)) if rng.random() < 0.8 else []
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randint(0, len(token))
+        edit = rng.choice(("insert", "delete", "replace", "vowel"))
+        if edit == "insert" or not token:
+            token.insert(i, rng.choice(letters))
+        elif edit == "delete":
+            del token[min(i, len(token) - 1)]
+        elif edit == "replace":
+            token[min(i, len(token) - 1)] = rng.choice(letters)
+        else:
+            token.insert(i, rng.choice("aeiou"))
+    token = "".join(token) or rng.choice(letters)
+    casing = rng.random()
+    return token.upper() if casing < 0.1 else token.capitalize() if casing < 0.2 else token
+
+
+def test_normalize_token(trials=5000):
+    try:
+        # a small cache so entries are evicted and looked up again
+        normalizer = JejemonNormalizer(cache_size=256)
+        rng = random.Random(12)
+        keys = list(normalizer.word_map)
+        tokens = [_random_token(rng, keys) for _ in range(trials)]
+        for token in tokens + tokens[::-1]:
+            assert normalizer.normalize_token(token) == _scan_normalize_token(normalizer, token), repr(token)
+        assert normalizer.cache_info()["hits"] > 0
+        print(f"✅ normalize_token matches the linear scan ({2 * trials} lookups)")
+
+        # Changing either map drops cached results
+        token = next(t for t in tokens if t.islower() and t not in normalizer.word_map and len(t) > 2)
+        normalizer.normalize_token(token)
+        normalizer.word_map[token] = "changed"
+        assert normalizer.normalize_token(token) == "changed"
+        del normalizer.word_map[token]
+        assert normalizer.normalize_token(token) == _scan_normalize_token(normalizer, token)
+        normalizer.normalize_token("4b")
+        normalizer.char_map["b"] = "p"
+        assert normalizer.normalize_token("4b") == "ap"
+        normalizer.word_map = {"xyzzy": "plugh"}
+        assert normalizer.normalize_token("xyzy") == "plugh"
+        assert normalizer.normalize_token(keys[0]) == _scan_normalize_token(normalizer, keys[0])
+        print("✅ Map changes invalidate the cache")
+        return True
+    except Exception as e:
+        print(f"❌ normalize_token test failed: {e!r}")
+        return False
+
+
+if __name__ == "__main__":
+    print("🧪 Testing Jejemon core")
+    print("=" * 40)
+
+    results = [
+        test_char_replacer(),
+        test_normalize_token(),
+    ]
+
+    if all(results):
+        print("\n🎉 All tests passed!")
+    else:
+        print("\n⚠️  Some tests failed.")
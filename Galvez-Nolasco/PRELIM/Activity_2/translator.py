@@ -1,9 +1,18 @@
+import sys
+import time
+import random
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from core import Tokenizer, JejemonNormalizer
 
 class JejemonTranslator:
-    def __init__(self):
+    def __init__(self, cache_size=65536):
         self.tokenizer = Tokenizer()
-        self.normalizer = JejemonNormalizer()
+        # Chat logs repeat the same handful of tokens, so keep a large token cache
+        self.normalizer = JejemonNormalizer(cache_size=cache_size)
 
     def is_jejemon(self, text):
         word_map = self.normalizer.word_map
@@ -15,5 +24,93 @@ class JejemonTranslator:
         normalized_tokens = [self.normalizer.normalize_token(tok) for tok in tokens]
         return "".join(token for token in normalized_tokens if token is not None)
 
-    def jejemonize(self, text):
-        return self.normalizer.jejemonize(text, self.tokenizer)
+    def jejemonize(self, text, rng=None):
+        return self.normalizer.jejemonize(text, self.tokenizer, rng=rng)
+
+    def normalize_many(self, texts):
+        for text in texts:
+            yield self.normalize(text)
+
+    def jejemonize_many(self, texts, seed=None, start=0):
+        # Seeded runs derive one generator per line number, so the output does
+        # not depend on how lines are split between workers.
+        for i, text in enumerate(texts, start):
+            rng = random.Random(f"{seed}:{i}") if seed is not None else None
+            yield self.jejemonize(text, rng=rng)
+
+    def cache_info(self):
+        return self.normalizer.cache_info()
+
+    def translate_stream(self, lines, mode="normalize", workers=1, chunk_size=1000, seed=None):
+        if mode not in ("normalize", "jejemonize"):
+            raise ValueError(f"Unknown mode: {mode}")
+        if workers <= 1:
+            if mode == "normalize":
+                yield from self.normalize_many(lines)
+            else:
+                yield from self.jejemonize_many(lines, seed)
+            return
+
+        lines = iter(lines)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded window of chunks in flight so memory stays flat
+            pending = deque()
+            start = 0
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = list(islice(lines, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_translate_chunk, mode, chunk, seed, start))
+                    start += len(chunk)
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+
+    def translate_file(self, source, destination, mode="normalize", workers=1, chunk_size=1000, seed=None):
+        start = time.perf_counter()
+        count = 0
+        for line in self.translate_stream(source, mode, workers, chunk_size, seed):
+            destination.write(line)
+            count += 1
+        elapsed = time.perf_counter() - start
+        return {
+            "lines": count,
+            "seconds": elapsed,
+            "lines_per_second": count / elapsed if elapsed > 0 else 0.0,
+        }
+
+_worker_translator = None
+
+def _translate_chunk(mode, lines, seed=None, start=0):
+    global _worker_translator
+    if _worker_translator is None:
+        _worker_translator = JejemonTranslator()
+    if mode == "normalize":
+        return list(_worker_translator.normalize_many(lines))
+    return list(_worker_translator.jejemonize_many(lines, seed, start))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate a chat log line by line.")
+    parser.add_argument("mode", choices=["normalize", "jejemonize"])
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="lines per worker chunk")
+    parser.add_argument("--seed", help="make jejemonize output reproducible")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    destination = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        stats = JejemonTranslator().translate_file(source, destination, args.mode, args.workers, args.chunk_size, args.seed)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+
+    print(f"{stats['lines']} lines in {stats['seconds']:.2f}s ({stats['lines_per_second']:.0f} lines/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()